@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Time each field parser and the whole parsing over a dataset, and compare
+the timings against a baseline produced by an earlier run.
+"""
+
+import argparse
+from functools import partial
+import gc
+import glob
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from typing import Any, Callable, Dict, List
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from document import Document  # noqa: E402
+import pyser  # noqa: E402
+
+
+def parse_field(field_parser: Callable[[Document], object],
+                text: str) -> object:
+    # A fresh document, so that its views are computed within the timing.
+    return field_parser(Document(text))
+
+
+def parse_all(text: str) -> object:
+    return pyser.parse(text)
+
+
+def benchmark_targets() -> Dict[str, Callable[[str], object]]:
+    """The functions to time, each taking the plaintext of a document."""
+
+    targets: Dict[str, Callable[[str], object]] = {}
+
+    for field_parser in pyser.FIELD_PARSERS.values():
+        name = f"{field_parser.__module__}.parse"
+        targets[name] = partial(parse_field, field_parser)
+
+    targets["pyser.parse"] = parse_all
+    return targets
+
+
+def time_target(target: Callable[[str], object], texts: List[str],
+                warmup: int, repeat: int) -> List[float]:
+    """Time the runs of the target over all the texts, in seconds."""
+
+    runs = []
+
+    for i in range(warmup + repeat):
+        gc.collect()
+        start = time.perf_counter()
+        for text in texts:
+            target(text)
+        seconds = time.perf_counter() - start
+
+        if i >= warmup:
+            runs.append(seconds)
+
+    return runs
+
+
+def run_benchmarks(texts: List[str], warmup: int, repeat: int,
+                   targets: List[str]) -> Dict[str, Any]:
+    results = {}
+
+    for name, target in benchmark_targets().items():
+        if targets and name not in targets:
+            continue
+
+        runs = time_target(target, texts, warmup, repeat)
+        median = statistics.median(runs)
+        results[name] = {"median": median, "min": min(runs), "runs": runs}
+        print(f"{name:34} {median * 1000:10.2f} ms", file=sys.stderr)
+
+    return {
+        "python": platform.python_version(),
+        "documents": len(texts),
+        "characters": sum(len(text) for text in texts),
+        "warmup": warmup,
+        "repeat": repeat,
+        "results": results,
+    }
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any],
+            threshold: float) -> bool:
+    """
+    Print the relative timings against the baseline and tell whether none
+    of the targets got slower by more than the threshold.
+    """
+
+    passed = True
+    print("target".ljust(34), "baseline [ms]", "current [ms]", "change",
+          sep="  ")
+
+    for name, current in results["results"].items():
+        if name not in baseline["results"]:
+            continue
+
+        before = baseline["results"][name]["median"]
+        after = current["median"]
+        ratio = after / before if before > 0 else 1.0
+        regressed = ratio > 1 + threshold
+        passed = passed and not regressed
+
+        print(name.ljust(34), f"{before * 1000:13.2f}",
+              f"{after * 1000:12.2f}", f"{(ratio - 1) * 100:+6.1f} %",
+              "REGRESSION" if regressed else "", sep="  ")
+
+    return passed
+
+
+def parse_args():
+    """Parse the command-line arguments."""
+
+    argument_parser = argparse.ArgumentParser(
+        description="Benchmark the PySer parsers over a dataset of "
+                    "plaintext documents.")
+
+    argument_parser.add_argument(
+        "dataset_folder",
+        help="Path to the folder with the plaintext (.txt) documents.",
+        type=str)
+    argument_parser.add_argument(
+        "-o", "--output",
+        help="Path to a file to write the results in JSON into.",
+        type=str, default=None)
+    argument_parser.add_argument(
+        "-b", "--baseline",
+        help="Path to the results of an earlier run to compare against.",
+        type=str, default=None)
+    argument_parser.add_argument(
+        "-t", "--threshold",
+        help="The relative slowdown of the median time over the baseline "
+             "considered a regression.",
+        type=float, default=0.1)
+    argument_parser.add_argument(
+        "--warmup",
+        help="The number of untimed runs over the dataset.",
+        type=int, default=1)
+    argument_parser.add_argument(
+        "--repeat",
+        help="The number of timed runs over the dataset.",
+        type=int, default=5)
+    argument_parser.add_argument(
+        "--targets",
+        help="A comma-separated list of the timed functions, "
+             "all of them by default.",
+        type=lambda string: string.split(","), default=[])
+    return argument_parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+
+    texts = []
+    for path in sorted(glob.glob(os.path.join(args.dataset_folder, "*.txt"))):
+        with open(path, "r", encoding="utf8") as file:
+            texts.append(file.read())
+
+    results = run_benchmarks(texts, args.warmup, args.repeat, args.targets)
+
+    if args.output is not None:
+        with open(args.output, "w", encoding="utf8") as file:
+            json.dump(results, file, indent=4)
+
+    if args.baseline is not None:
+        with open(args.baseline, "r", encoding="utf8") as file:
+            baseline = json.load(file)
+        if not compare(results, baseline, args.threshold):
+            return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
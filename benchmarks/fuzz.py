@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Run each field parser over generated worst-case inputs, such as long runs
+of the characters the regular expressions repeat over, and check that
+none of them takes longer than a time ceiling.
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from typing import Callable, Dict, List
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from budget import call_with_budget  # noqa: E402
+from document import Document  # noqa: E402
+import pyser  # noqa: E402
+
+
+# Fragments the random inputs are composed of.
+ATOMS = [
+    " ", "  ", "      ", "\n", "\n\n\n\n", "\t", ".", "..", ". ", "-", ":",
+    "[", "]", "1", "1.2", "12", "v1.0", "A", "Title", "EAL", "SHA", "RSA",
+    "revision", "date", "version", "description", "title:", "01.02.2020",
+]
+
+
+def worst_cases(size: int) -> Dict[str, str]:
+    """Inputs of about the given size, repeating what the patterns repeat."""
+
+    def repeat(piece: str) -> str:
+        return piece * max(1, size // len(piece))
+
+    return {
+        "dots": "1 A" + repeat("."),
+        "dotted spaces": "1 A" + repeat(". "),
+        "spaces": "1 A" + repeat(" ") + "x",
+        "digits": repeat("1"),
+        "section numbers": "1 A" + repeat("1.2"),
+        "newlines": repeat("\n"),
+        "dotted lines": repeat("1 Title" + "." * 40 + "\n"),
+        "undotted lines": repeat("1 Title" + " " * 40 + "x\n"),
+        "entry starts": repeat("1 A ") + "." * 100,
+        "brackets": repeat("["),
+        "numeric brackets": "[" + repeat("1"),
+        "interleaved brackets": repeat("[1"),
+        "labels": repeat("[a]"),
+        "spaces after revision header":
+            "revision date description\n" + repeat(" "),
+        "spaces after date header":
+            "date version description\n" + repeat(" "),
+        "numbers after version header":
+            "version  description\n" + repeat(" 1"),
+        "revision words": repeat("rev") + " date description\n",
+        "date headers": repeat("date ver "),
+        "title labels": repeat("title: x\n"),
+        "version hits": repeat("EAL4+SHA-256 RSA2048 "),
+    }
+
+
+def random_cases(size: int, count: int, seed: int) -> Dict[str, str]:
+    """Inputs of about the given size, composed randomly of the atoms."""
+
+    generator = random.Random(seed)
+    cases = {}
+
+    for i in range(count):
+        # A few atoms repeated, like the garbage of a broken conversion.
+        atoms = generator.sample(ATOMS, generator.randint(1, 4))
+        pieces: List[str] = []
+        length = 0
+        while length < size:
+            piece = generator.choice(atoms) * generator.randint(1, 200)
+            pieces.append(piece)
+            length += len(piece)
+        cases[f"random {i} ({'|'.join(map(repr, atoms))})"] = "".join(pieces)
+
+    return cases
+
+
+def time_parser(field_parser: Callable[[Document], object], text: str,
+                limit: float) -> float:
+    """
+    Time the parser over the text, in seconds. It is interrupted after
+    the limit, so a pathological case does not stall the whole run.
+    """
+
+    start = time.perf_counter()
+    call_with_budget(field_parser, Document(text), limit, None)
+    return time.perf_counter() - start
+
+
+def parse_args():
+    """Parse the command-line arguments."""
+
+    argument_parser = argparse.ArgumentParser(
+        description="Check the PySer parsers against worst-case inputs.")
+
+    argument_parser.add_argument(
+        "-s", "--size",
+        help="The approximate size of each input, in characters.",
+        type=int, default=100_000)
+    argument_parser.add_argument(
+        "-c", "--ceiling",
+        help="The maximum time in seconds a field parser may take "
+             "on a single input.",
+        type=float, default=1.0)
+    argument_parser.add_argument(
+        "--random",
+        help="The number of randomly composed inputs.",
+        type=int, default=20)
+    argument_parser.add_argument(
+        "--seed",
+        help="The seed of the randomly composed inputs.",
+        type=int, default=0)
+    return argument_parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+
+    cases = worst_cases(args.size)
+    cases.update(random_cases(args.size, args.random, args.seed))
+    failures = 0
+
+    for name, text in cases.items():
+        for field, field_parser in pyser.FIELD_PARSERS.items():
+            # Slow cases are stopped well past the ceiling.
+            seconds = time_parser(field_parser, text, args.ceiling * 10)
+            failed = seconds > args.ceiling
+            failures += failed
+
+            if failed or seconds > args.ceiling / 10:
+                print(f"{seconds * 1000:10.2f} ms", field.ljust(18), name,
+                      "OVER CEILING" if failed else "", sep="  ",
+                      file=sys.stderr)
+
+    print(f"{len(cases)} inputs, {failures} over the ceiling of "
+          f"{args.ceiling} s", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+"""
+Parse and score each document of a dataset against its reference, timing
+each field parser, and compare the scores and the timings against
+a baseline report produced by an earlier run.
+"""
+
+import argparse
+from functools import partial
+import gc
+import glob
+import json
+import math
+import os
+import platform
+import sys
+import time
+from typing import Any, Callable, Dict, List, Tuple
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..",
+                                "pa193_dataset"))
+
+from benchmark import parse_all, parse_field  # noqa: E402
+import output_compare  # noqa: E402
+import pyser  # noqa: E402
+
+
+# Timing changes below this many seconds are within the noise, and never
+# reported as slowdowns.
+NOISE_FLOOR = 0.005
+
+# The entry of the whole document, along with the fields.
+ALL = "all"
+
+
+def best_time(function: Callable[[str], Any], text: str, repeat: int) \
+        -> Tuple[Any, float]:
+    """The result of the function and its shortest time, in seconds."""
+
+    best = math.inf
+
+    for _ in range(repeat):
+        # Collected outside of the timing, so that it does not add up to
+        # the times of random documents.
+        gc.collect()
+        gc.disable()
+        try:
+            start = time.perf_counter()
+            result = function(text)
+            best = min(best, time.perf_counter() - start)
+        finally:
+            gc.enable()
+
+    return result, best
+
+
+def report_document(text: str, expected: Dict, repeat: int) \
+        -> Dict[str, Dict[str, float]]:
+    """Score and time each field of a single document, and all of them."""
+
+    actual = {}
+    seconds = {}
+
+    for field, field_parser in pyser.FIELD_PARSERS.items():
+        actual[field], seconds[field] = best_time(
+            partial(parse_field, field_parser), text, repeat)
+    _, seconds[ALL] = best_time(parse_all, text, repeat)
+
+    # Scored as written, e.g. with the tuples turned into lists.
+    actual = json.loads(json.dumps(actual))
+    scores = dict(zip(pyser.FIELD_PARSERS,
+                      output_compare.check(actual, expected)))
+    # Rounded up like the total of the evaluation.
+    scores[ALL] = math.ceil(sum(scores.values()))
+
+    return {field: {"score": scores[field], "seconds": seconds[field]}
+            for field in seconds}
+
+
+def run_report(dataset_folder: str, repeat: int) -> Dict[str, Any]:
+    documents = {}
+
+    for path in sorted(glob.glob(os.path.join(dataset_folder, "*.txt"))):
+        name = os.path.splitext(os.path.basename(path))[0]
+        with open(path, "r", encoding="utf8") as file:
+            text = file.read()
+        with open(os.path.splitext(path)[0] + ".json", "r",
+                  encoding="utf8") as file:
+            expected = json.load(file)
+
+        documents[name] = report_document(text, expected, repeat)
+
+    totals = {
+        field: {
+            "score": sum(document[field]["score"]
+                         for document in documents.values()),
+            "seconds": sum(document[field]["seconds"]
+                           for document in documents.values()),
+        }
+        for field in list(pyser.FIELD_PARSERS) + [ALL]
+    }
+
+    for field, total in totals.items():
+        print(f"{field:20} {total['score']:8.1f} "
+              f"{total['seconds'] * 1000:10.2f} ms", file=sys.stderr)
+
+    return {
+        "python": platform.python_version(),
+        "repeat": repeat,
+        "totals": totals,
+        "documents": documents,
+    }
+
+
+def regressions(current: Dict[str, Dict[str, float]],
+                before: Dict[str, Dict[str, float]], score_threshold: float,
+                time_threshold: float) -> List[Tuple[str, str]]:
+    """
+    The (field, description) of each score dropping by more than the score
+    threshold, and each time getting slower by more than the relative time
+    threshold, with the fields found in both.
+    """
+
+    found = []
+
+    for field, after in current.items():
+        if field not in before:
+            continue
+
+        drop = before[field]["score"] - after["score"]
+        if drop > score_threshold:
+            found.append((field, f"score {before[field]['score']:.2f} -> "
+                                 f"{after['score']:.2f}"))
+
+        old_seconds = before[field]["seconds"]
+        new_seconds = after["seconds"]
+        if new_seconds - old_seconds > NOISE_FLOOR and \
+                new_seconds > old_seconds * (1 + time_threshold):
+            found.append((field, f"time {old_seconds * 1000:.2f} -> "
+                                 f"{new_seconds * 1000:.2f} ms"))
+
+    return found
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any],
+            score_threshold: float, time_threshold: float,
+            document_time_threshold: float) -> bool:
+    """
+    Print the totals against the baseline and the regressed documents, and
+    tell whether no score dropped by more than the score threshold, and no
+    time got slower by more than the relative time threshold, or by more
+    than the document time threshold for the noisier single documents.
+    """
+
+    print("field".ljust(20), "baseline score", "score", "baseline [ms]",
+          "time [ms]", "change", sep="  ")
+
+    for field, total in report["totals"].items():
+        if field not in baseline["totals"]:
+            continue
+
+        before = baseline["totals"][field]
+        ratio = total["seconds"] / before["seconds"] \
+            if before["seconds"] > 0 else 1.0
+        print(field.ljust(20), f"{before['score']:14.1f}",
+              f"{total['score']:5.1f}", f"{before['seconds'] * 1000:13.2f}",
+              f"{total['seconds'] * 1000:9.2f}",
+              f"{(ratio - 1) * 100:+6.1f} %", sep="  ")
+
+    found = [("total", field, description) for field, description in
+             regressions(report["totals"], baseline["totals"],
+                         score_threshold, time_threshold)]
+
+    for name, document in report["documents"].items():
+        if name in baseline["documents"]:
+            found += [(name, field, description) for field, description in
+                      regressions(document, baseline["documents"][name],
+                                  score_threshold, document_time_threshold)]
+
+    if found:
+        print()
+    for name, field, description in found:
+        print("REGRESSION", name, field, description, sep="  ")
+
+    return not found
+
+
+def parse_args():
+    """Parse the command-line arguments."""
+
+    argument_parser = argparse.ArgumentParser(
+        description="Report the accuracy and the speed of the PySer parsers "
+                    "over a dataset of plaintext documents with their "
+                    "reference JSON files.")
+
+    argument_parser.add_argument(
+        "dataset_folder",
+        help="Path to the folder with the plaintext (.txt) documents and "
+             "the correspondingly named reference (.json) files.",
+        type=str)
+    argument_parser.add_argument(
+        "-o", "--output",
+        help="Path to a file to write the report in JSON into.",
+        type=str, default=None)
+    argument_parser.add_argument(
+        "-b", "--baseline",
+        help="Path to the report of an earlier run to compare against.",
+        type=str, default=None)
+    argument_parser.add_argument(
+        "--score_threshold",
+        help="The drop of a score below the baseline considered "
+             "a regression, in points.",
+        type=float, default=0.5)
+    argument_parser.add_argument(
+        "--time_threshold",
+        help="The relative slowdown of a total time over the baseline "
+             "considered a regression.",
+        type=float, default=0.2)
+    argument_parser.add_argument(
+        "--document_time_threshold",
+        help="The relative slowdown of the time of a single document over "
+             "the baseline considered a regression. Slowdowns under "
+             f"{NOISE_FLOOR * 1000:g} ms are ignored.",
+        type=float, default=1.0)
+    argument_parser.add_argument(
+        "--repeat",
+        help="The number of runs of each parser, of which the fastest "
+             "is reported.",
+        type=int, default=3)
+    return argument_parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+
+    report = run_report(args.dataset_folder, args.repeat)
+
+    if args.output is not None:
+        with open(args.output, "w", encoding="utf8") as file:
+            json.dump(report, file, indent=4)
+
+    if args.baseline is not None:
+        with open(args.baseline, "r", encoding="utf8") as file:
+            baseline = json.load(file)
+        if not compare(report, baseline, args.score_threshold,
+                       args.time_threshold, args.document_time_threshold):
+            return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,21 +1,34 @@
 #!/bin/env python3
-import sys
+import argparse
 import json
 import math
 import os
 from difflib import SequenceMatcher
+from multiprocessing import Pool
 
 def load_file(file):
     with open(file, "r", encoding="utf8") as f:
         return json.load(f)
 
+def sequence_ratio(actual, expected):
+    # Equal to SequenceMatcher(None, actual, expected).ratio(), short-circuiting
+    # the quadratic matching where the result is known: identical sequences
+    # always match fully, and sequences without any common element, where
+    # the upper bounds real_quick_ratio() or quick_ratio() are 0, not at all.
+    if actual == expected:
+        return 1.0
+    if not actual or not expected or set(expected).isdisjoint(actual):
+        return 0.0
+
+    return SequenceMatcher(None, actual, expected).ratio()
+
 def check_title(actual, expected):
     if not "title" in actual.keys():
         if not "title" in expected:
             return 20
         return 0
 
-    similarity = SequenceMatcher(None, actual["title"], expected["title"]).ratio()
+    similarity = sequence_ratio(actual["title"], expected["title"])
     return 20 * similarity
 
 def check_versions(actual, expected):
@@ -70,15 +83,15 @@ def check_toc(actual, expected):
 
     actual_numbers = list(map(lambda x: x[0], actual))
     expected_numbers = list(map(lambda x: x[0], expected))
-    score += len(expected) * SequenceMatcher(None, actual_numbers, expected_numbers).ratio()
+    score += len(expected) * sequence_ratio(actual_numbers, expected_numbers)
 
     actual_sections = list(map(lambda x: x[1], actual))
     expected_sections = list(map(lambda x: x[1], expected))
-    score += len(expected) * SequenceMatcher(None, actual_sections, expected_sections).ratio()
+    score += len(expected) * sequence_ratio(actual_sections, expected_sections)
 
     actual_pages = list(map(lambda x: x[2], actual))
     expected_pages = list(map(lambda x: x[2], expected))
-    score += len(expected) * SequenceMatcher(None, actual_pages, expected_pages).ratio()
+    score += len(expected) * sequence_ratio(actual_pages, expected_pages)
 
     for item in actual:
         if item in expected:
@@ -105,15 +118,15 @@ def check_revisions(actual, expected):
 
     actual_versions = list(map(lambda x: x["version"], actual))
     expected_versions = list(map(lambda x: x["version"], expected))
-    score += len(expected) * SequenceMatcher(None, actual_versions, expected_versions).ratio()
+    score += len(expected) * sequence_ratio(actual_versions, expected_versions)
 
     actual_dates = list(map(lambda x: x["date"], actual))
     expected_dates = list(map(lambda x: x["date"], expected))
-    score += len(expected) * SequenceMatcher(None, actual_dates, expected_dates).ratio()
+    score += len(expected) * sequence_ratio(actual_dates, expected_dates)
 
     actual_descriptions = list(map(lambda x: x["description"], actual))
     expected_descriptions = list(map(lambda x: x["description"], expected))
-    score += len(expected) * SequenceMatcher(None, actual_descriptions, expected_descriptions).ratio()
+    score += len(expected) * sequence_ratio(actual_descriptions, expected_descriptions)
 
     for item in actual:
         if item in expected:
@@ -142,7 +155,7 @@ def check_bibliography(actual, expected):
         if key not in expected:
             continue
         score += 1
-        score += SequenceMatcher(None, actual[key], expected[key]).ratio()
+        score += sequence_ratio(actual[key], expected[key])
 
     return 20 * score / max_score
 
@@ -153,19 +166,40 @@ def check(actual, expected):
     return scores
 
 
+def check_files(actual_folder, expected_folder, filename):
+    actual = load_file(os.path.join(actual_folder, filename))
+    expected = load_file(os.path.join(expected_folder, filename))
+    return check(actual, expected), filename
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Score the output JSON files against the reference ones.")
+    parser.add_argument("output_json", help="An output JSON file, or a folder of them.")
+    parser.add_argument("reference_json", help="The reference JSON file, or a folder of them.")
+    parser.add_argument("-v", "--verbose", help="Print the scores of each field (and file).",
+                        action="store_true")
+    parser.add_argument("-j", "--jobs", help="The number of processes scoring the files in a folder, "
+                                              "0 meaning one per available CPU.",
+                        type=int, default=1)
+    return parser.parse_args()
+
+
 def main():
-    verbose = len(sys.argv) >= 4 and sys.argv[3] == "-v"
-
-    if os.path.isdir(sys.argv[1]) and os.path.isdir(sys.argv[2]):
-        rows = []
-    
-        for filename in os.listdir(sys.argv[1]):
-            actual_path = os.path.join(sys.argv[1], filename)
-            expected_path = os.path.join(sys.argv[2], filename)
-            actual = load_file(actual_path)
-            expected = load_file(expected_path)
-            scores = check(actual, expected)
-            rows.append((scores, filename))
+    args = parse_args()
+    verbose = args.verbose
+    jobs = args.jobs if args.jobs > 0 else os.cpu_count() or 1
+
+    if os.path.isdir(args.output_json) and os.path.isdir(args.reference_json):
+        filenames = os.listdir(args.output_json)
+        tasks = [(args.output_json, args.reference_json, filename) for filename in filenames]
+
+        # The rows keep the order of the files, so the sums are the same either way.
+        if jobs > 1:
+            with Pool(jobs) as pool:
+                rows = pool.starmap(check_files, tasks, max(1, len(tasks) // (jobs * 4)))
+        else:
+            rows = [check_files(*task) for task in tasks]
         
         if verbose:
             print("", "  ".join(["sum", "tit", "ver", "toc", "rev", "bib"]), "name")
@@ -184,8 +218,8 @@ def main():
         print()
         
     else:
-        actual = load_file(sys.argv[1])
-        expected = load_file(sys.argv[2])
+        actual = load_file(args.output_json)
+        expected = load_file(args.reference_json)
         scores = check(actual, expected)
 
         print(math.ceil(sum(scores)), end="")
@@ -197,8 +231,4 @@ def main():
 
 
 if __name__ == "__main__":
-    if len(sys.argv) < 3:
-        print(f"USAGE: {sys.argv[0]} <output_json> <reference_json> [-v]", file=sys.stderr)
-        sys.exit(1)
-
     main()
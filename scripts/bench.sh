@@ -0,0 +1,11 @@
+#!/bin/bash
+
+trap exit SIGINT
+
+baseline="bench_baseline.json"
+
+if [ -f "$baseline" ]; then
+    python3 benchmarks/benchmark.py pa193_dataset/dataset/ --baseline="$baseline" "$@"
+else
+    python3 benchmarks/benchmark.py pa193_dataset/dataset/ --output="$baseline" "$@"
+fi
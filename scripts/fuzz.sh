@@ -0,0 +1,5 @@
+#!/bin/bash
+
+trap exit SIGINT
+
+python3 benchmarks/fuzz.py "$@"
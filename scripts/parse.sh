@@ -6,5 +6,5 @@ out_dir="output"
 
 mkdir -p "$out_dir"
 
-python3 src/pyser.py --output_folder="$out_dir" pa193_dataset/dataset/*.txt
+python3 src/pyser.py --output_folder="$out_dir" --jobs=0 pa193_dataset/dataset
 
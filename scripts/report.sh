@@ -0,0 +1,11 @@
+#!/bin/bash
+
+trap exit SIGINT
+
+baseline="report_baseline.json"
+
+if [ -f "$baseline" ]; then
+    python3 benchmarks/report.py pa193_dataset/dataset/ --output="report.json" --baseline="$baseline" "$@"
+else
+    python3 benchmarks/report.py pa193_dataset/dataset/ --output="$baseline" "$@"
+fi
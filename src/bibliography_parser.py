@@ -1,18 +1,119 @@
 from common import squash_whitespace
-import re
-from typing import Dict
+from document import Document
+import patterns
+from typing import Dict, Iterator, Set
 
 
-def parse(plain_text: str) -> Dict[str, str]:
-    references_found = set(re.findall(r"\[[0-9]*-?[0-9]*?\]", plain_text))
+# The same labels as `\[[0-9]*-?[0-9]*?\]`, without trying each split of
+# a long run of digits between the two quantifiers.
+RE_NUMERIC_REFERENCE = patterns.compile("bibliography.numeric_reference",
+                                        r"\[[0-9]*(?:-[0-9]*)?\]")
+
+# Only the beginning of a definition makes it to the result.
+MAX_DEFINITION_LENGTH = 250
+
+
+def find_references(plain_text: str) -> Set[str]:
+    """
+    Collect the distinct bracketed reference labels, preferring numeric ones
+    if there are enough of them.
+    """
+
+    references_found = set(RE_NUMERIC_REFERENCE.findall(plain_text))
     if len(references_found) < 5:
-        references_found = set(re.findall(r"\[.*?\]", plain_text))
+        references_found = set(any_references(plain_text))
+    return references_found
+
+
+def any_references(plain_text: str) -> Iterator[str]:
+    r"""
+    Produce the labels matched by `\[.*?\]`, i.e. from an opening bracket
+    up to the nearest closing one on the same line.
+
+    Unlike the regular expression, a line is searched for a closing bracket
+    only once past each opening one, not up to its end for each of them.
+    """
+
+    start = plain_text.find("[")
+    newline = -1
+
+    while start != -1:
+        if newline < start:
+            newline = plain_text.find("\n", start)
+            if newline == -1:
+                newline = len(plain_text)
+
+        closing = plain_text.find("]", start, newline)
+        if closing == -1:
+            # No opening bracket before the line break is closed.
+            start = plain_text.find("[", newline)
+            continue
+
+        yield plain_text[start:closing + 1]
+        start = plain_text.find("[", closing + 1)
+
+
+def find_definitions(plain_text: str, references: Set[str]) -> Dict[str, str]:
+    """
+    Find the last definition of each reference, i.e. the text between its
+    last occurrence followed by a space and the next opening bracket.
+
+    Neither kind of label spans a line or contains a closing bracket before
+    its end, so the only label possibly starting at an opening bracket is
+    the text up to the nearest closing bracket. The document is walked
+    backwards over the opening brackets, which usually resolves all
+    the definitions within the bibliography at its end, and stops once
+    every reference has been resolved.
+    """
 
     result = {}
-    for i in references_found:
-        definitions_found = re.findall(rf"{re.escape(i)} +([^\[]*)", plain_text)
-        if definitions_found:
-            result[i] = definitions_found[-1][:250]
-            result[i] = squash_whitespace(result[i])
+    unresolved = set(references)
+
+    start = len(plain_text)
+    next_closing = -1
+    next_newline = -1
+
+    while unresolved:
+        end = start
+        start = plain_text.rfind("[", 0, end)
+        if start == -1:
+            break
+
+        # Keep track of the nearest closing bracket and line break after
+        # the opening one, reusing the previous ones if there is none before.
+        closing = plain_text.find("]", start, end)
+        if closing != -1:
+            next_closing = closing
+        newline = plain_text.find("\n", start, end)
+        if newline != -1:
+            next_newline = newline
+
+        if next_closing == -1 or next_newline != -1 and \
+                next_newline < next_closing:
+            continue
+
+        label = plain_text[start:next_closing + 1]
+        if label not in unresolved or \
+                not plain_text.startswith(" ", next_closing + 1):
+            continue
+
+        definition_start = next_closing + 1
+        while plain_text.startswith(" ", definition_start):
+            definition_start += 1
+
+        definition_end = plain_text.find(
+            "[", definition_start,
+            definition_start + MAX_DEFINITION_LENGTH)
+        if definition_end == -1:
+            definition_end = definition_start + MAX_DEFINITION_LENGTH
+
+        unresolved.remove(label)
+        result[label] = squash_whitespace(
+            plain_text[definition_start:definition_end])
 
     return result
+
+
+def parse(document: Document) -> Dict[str, str]:
+    plain_text = document.text
+    return find_definitions(plain_text, find_references(plain_text))
@@ -0,0 +1,59 @@
+import signal
+import threading
+from typing import Callable, Optional, Tuple, TypeVar
+
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+# The default time a single field parser may take on a single document.
+DEFAULT_FIELD_BUDGET = 30.0
+
+
+class BudgetExceeded(Exception):
+    """Raised within a call running out of its time budget."""
+
+
+def budget_supported() -> bool:
+    """
+    Tell whether calls can be interrupted on running out of their budget.
+    This needs interval timers, available only on Unix-like platforms,
+    and running in the main thread, which alone receives the signals.
+    """
+
+    return hasattr(signal, "setitimer") and \
+        threading.current_thread() is threading.main_thread()
+
+
+def call_with_budget(function: Callable[[T], R], argument: T,
+                     seconds: Optional[float], fallback: Callable[[], R]) \
+        -> Tuple[R, bool]:
+    """
+    Call the function, interrupting it once it runs for longer than
+    the given seconds, in which case the fallback is called instead.
+    Also tell whether the budget was exceeded. The call is not limited if
+    no budget is given, or if it is not supported, see `budget_supported`.
+
+    Regular expression matching is interrupted too, as it checks for
+    signals while backtracking.
+    """
+
+    if seconds is None or seconds <= 0 or not budget_supported():
+        return function(argument), False
+
+    def expire(signal_number, frame) -> None:
+        raise BudgetExceeded()
+
+    previous_handler = signal.signal(signal.SIGALRM, expire)
+    try:
+        signal.setitimer(signal.ITIMER_REAL, seconds)
+        try:
+            return function(argument), False
+        finally:
+            # Disarmed within the handled block, so that the signal cannot
+            # arrive after the budget stopped being handled.
+            signal.setitimer(signal.ITIMER_REAL, 0)
+    except BudgetExceeded:
+        return fallback(), True
+    finally:
+        signal.signal(signal.SIGALRM, previous_handler)
@@ -0,0 +1,145 @@
+import glob
+import hashlib
+import json
+import os
+import tempfile
+from typing import Dict, List, Optional
+
+
+DEFAULT_CACHE_FOLDER = os.path.join(
+    os.environ.get("XDG_CACHE_HOME", os.path.expanduser("~/.cache")),
+    "pyser")
+DEFAULT_CACHE_SIZE = 512 * 1024 * 1024
+
+READ_BLOCK_SIZE = 1024 * 1024
+
+
+def parser_fingerprint() -> str:
+    """
+    Hash the sources of the parser, so that the results of any other
+    version of it are not reused.
+    """
+
+    digest = hashlib.sha256()
+    sources = glob.glob(os.path.join(os.path.dirname(__file__), "*.py"))
+
+    for source in sorted(sources):
+        with open(source, "rb") as file:
+            digest.update(os.path.basename(source).encode())
+            digest.update(file.read())
+
+    return digest.hexdigest()
+
+
+def hash_file(digest: "hashlib._Hash", path: str) -> None:
+    """Feed the contents of the file to the digest, block by block."""
+
+    with open(path, "rb") as file:
+        block = bytearray(READ_BLOCK_SIZE)
+        view = memoryview(block)
+        while True:
+            size = file.readinto(block)
+            if not size:
+                break
+            digest.update(view[:size])
+
+
+class ResultCache:
+    """
+    An on-disk cache of parsing results, addressed by the contents of the
+    parsed document and the version of the parser. The least recently used
+    results are evicted once the cache outgrows its maximum size.
+    """
+
+    def __init__(self, folder: str = DEFAULT_CACHE_FOLDER,
+                 max_size: int = DEFAULT_CACHE_SIZE, refresh: bool = False):
+        self.folder = folder
+        self.max_size = max_size
+        # Do not reuse the results, only store the new ones.
+        self.refresh = refresh
+        self.fingerprint = parser_fingerprint()
+
+    def key(self, input_path: str, fields: List[str],
+            contents: Optional[bytes] = None) -> str:
+        """
+        Address the result of the given fields of the input file, hashing
+        its contents, if already read.
+        """
+
+        digest = hashlib.sha256(self.fingerprint.encode())
+        digest.update(",".join(fields).encode())
+
+        if contents is not None:
+            digest.update(contents)
+            return digest.hexdigest()
+
+        hash_file(digest, input_path)
+        return digest.hexdigest()
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.folder, key[:2], key + ".json")
+
+    def get(self, key: str) -> Optional[Dict]:
+        """Produce the stored result, None if there is none."""
+
+        if self.refresh:
+            return None
+
+        path = self.path(key)
+        try:
+            with open(path, "r", encoding="utf8") as file:
+                result = json.load(file)
+            # The modification time keeps the order of use for the eviction.
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+
+        return result
+
+    def put(self, key: str, result: Dict) -> None:
+        """
+        Store the result, atomically, so that it may be written
+        concurrently by multiple processes. Nothing is stored if the cache
+        folder cannot be written to.
+        """
+
+        path = self.path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            descriptor, temporary_path = tempfile.mkstemp(
+                dir=os.path.dirname(path), suffix=".tmp")
+        except OSError:
+            # Caching is only an optimization, the result is not lost.
+            return
+
+        try:
+            with os.fdopen(descriptor, "w", encoding="utf8") as file:
+                json.dump(result, file, ensure_ascii=False,
+                          separators=(",", ":"))
+            os.replace(temporary_path, path)
+        except BaseException:
+            os.unlink(temporary_path)
+            raise
+
+    def evict(self) -> None:
+        """Remove the least recently used results over the maximum size."""
+
+        entries = []
+        total_size = 0
+
+        for path in glob.glob(os.path.join(self.folder, "*", "*.json")):
+            try:
+                status = os.stat(path)
+            except OSError:
+                continue
+            entries.append((status.st_mtime, status.st_size, path))
+            total_size += status.st_size
+
+        for _, size, path in sorted(entries):
+            if total_size <= self.max_size:
+                break
+            try:
+                os.unlink(path)
+            except OSError:
+                continue
+            total_size -= size
@@ -0,0 +1,345 @@
+from common import squash_whitespace
+from functools import cached_property
+import io
+import mmap
+import os
+import re
+from revision_anchors import RevisionAnchors
+import stat
+from typing import IO, Iterator, List, Tuple
+
+
+RE_WHITESPACE = re.compile(r"\s")
+
+# The sizes of the pieces the text is squashed in, when not at once: small
+# at first, for what is found early to be found fast, then doubling.
+FIRST_SQUASHED_PIECE_SIZE = 4 * 1024
+MAX_SQUASHED_PIECE_SIZE = 1024 * 1024
+
+# Characters whose lowercase form is not what a case-insensitive regular
+# expression matches them with, or which would change the text length.
+CASE_FOLDING_EXCEPTIONS = str.maketrans({
+    "İ": "i",  # Latin capital letter I with dot above
+    "ı": "i",  # Latin small letter dotless i
+    "ſ": "s",  # Latin small letter long s
+})
+
+
+class Document:
+    """
+    The plaintext contents of a single document, together with its derived
+    views shared by all the parsers. Each view is computed once, on first
+    use, so that a document is not copied over and over by each parser.
+    """
+
+    def __init__(self, text: str):
+        self.text = text
+
+    def __len__(self) -> int:
+        return len(self.text)
+
+    def __enter__(self) -> "Document":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Release the resources backing the document."""
+
+    def scan_windows(self) -> Iterator[Tuple[str, int, int]]:
+        """
+        Produce pieces of the whole document for sequential scanning, as
+        triples of a text, together with the start and end offsets within it
+        of the part that the piece is responsible for. Any text around these
+        offsets overlaps with the neighbouring pieces.
+        """
+
+        yield self.text, 0, len(self.text)
+
+    @cached_property
+    def lines(self) -> List[str]:
+        """The lines of the document, without the line breaks."""
+
+        return self.text.split("\n")
+
+    @cached_property
+    def line_starts(self) -> List[int]:
+        """The offsets of the first character of each line."""
+
+        starts = [0]
+        for line in self.lines[:-1]:
+            starts.append(starts[-1] + len(line) + 1)
+        return starts
+
+    def line_range(self, start: int, end: int) -> str:
+        """
+        The text of lines from `start` up to `end` (exclusive), as if they
+        were joined by line breaks.
+        """
+
+        if end >= len(self.line_starts):
+            return self.text[self.line_starts[start]:]
+        return self.text[self.line_starts[start]:self.line_starts[end] - 1]
+
+    def squashed_pieces(self) -> Iterator[str]:
+        """
+        Produce the text with squashed whitespace, see `squash_whitespace`,
+        piece by piece, so that it is not copied as a whole.
+        """
+
+        text = self.text
+        start = 0
+        size = FIRST_SQUASHED_PIECE_SIZE
+        separator = ""
+
+        while start < len(text):
+            # Split at whitespace, as the squashed words are, but not within
+            # a line broken after a dash, which joins the words around it.
+            end = start + size
+            while True:
+                boundary = RE_WHITESPACE.search(text, end)
+                end = boundary.start() if boundary else len(text)
+                if text[end - 1:end + 1] != "-\n":
+                    break
+                end += 1
+
+            piece = squash_whitespace(text[start:end])
+            if piece:
+                yield separator + piece
+                separator = " "
+
+            start = end
+            size = min(size * 2, MAX_SQUASHED_PIECE_SIZE)
+
+    def count_squashed(self, substring: str, limit: int) -> int:
+        """
+        Count the non-overlapping occurrences of the substring in
+        the squashed text, like `squash_whitespace(text).count`, but only
+        until the count exceeds the limit. The squashed text is produced
+        piece by piece, see `squashed_pieces`, so that a frequent substring
+        is counted without squashing the whole document.
+        """
+
+        if any(c.isspace() and c != " " for c in substring) or \
+                "  " in substring:
+            # The squashed text has no other whitespace than single spaces.
+            return 0
+
+        count = 0
+        # The text not yet searched that may hold the start of an occurrence.
+        rest = ""
+
+        for piece in self.squashed_pieces():
+            if not substring:
+                # Found before each character, and at the end.
+                count += len(piece)
+                if count + 1 > limit:
+                    return limit + 1
+                continue
+
+            rest += piece
+            start = 0
+            index = rest.find(substring)
+            while index != -1:
+                count += 1
+                if count > limit:
+                    return count
+                start = index + len(substring)
+                index = rest.find(substring, start)
+
+            # Only the end might start an occurrence going on in the next
+            # pieces.
+            rest = rest[max(start, len(rest) - len(substring) + 1):]
+
+        return count + 1 if not substring else count
+
+    @cached_property
+    def folded(self) -> str:
+        """
+        The lowercase document, having the same length as the original, so
+        that offsets found in either apply to both. Searching it with
+        a lowercase pattern is faster than a case-insensitive search.
+        """
+
+        text = self.text
+        # Translating is slow, hence only done when needed.
+        if any(chr(exception) in text
+               for exception in CASE_FOLDING_EXCEPTIONS):
+            text = text.translate(CASE_FOLDING_EXCEPTIONS)
+        return text.lower()
+
+    @cached_property
+    def revision_anchors(self) -> RevisionAnchors:
+        """The anchors of the revisions, see `RevisionAnchors`."""
+
+        return RevisionAnchors(self.folded)
+
+
+# Documents up to this size are decoded as a whole, larger ones are decoded
+# only in regions and streamed in chunks.
+MAX_DECODED_SIZE = 64 * 1024 * 1024
+
+# The regions of large documents in which the fields are looked for.
+HEAD_SIZE = 4 * 1024 * 1024
+TAIL_SIZE = 4 * 1024 * 1024
+ANCHOR_WINDOW_SIZE = 256 * 1024
+MAX_ANCHOR_WINDOWS = 32
+
+# Headings the revisions and the bibliography are usually found after.
+RE_REGION_ANCHORS = re.compile(
+    rb"revision history|version control|rev\w*\s+date|date\s+ver"
+    rb"|version\s\s+description|bibliography|references",
+    re.IGNORECASE)
+
+# Separates the regions, so that no field is found spanning two of them.
+REGION_SEPARATOR = "\n" * 4
+
+SCAN_CHUNK_SIZE = 4 * 1024 * 1024
+# The text preceding and following a chunk, for the matches to have
+# the context they would have in the whole document.
+SCAN_CHUNK_LEAD = 16
+SCAN_CHUNK_OVERLAP = 4 * 1024
+
+
+def translate_newlines(text: str) -> str:
+    """Translate the line breaks the same way as reading in text mode."""
+
+    if "\r" in text:
+        text = text.replace("\r\n", "\n").replace("\r", "\n")
+    return text
+
+
+class MappedDocument(Document):
+    """
+    A document too large to be decoded as a whole, memory-mapped instead.
+    Its text consists only of the regions the fields are usually found in:
+    the head, the tail and the windows following anchoring headings.
+    The whole document is scanned only chunk by chunk, so the memory used
+    does not depend on its size.
+    """
+
+    def __init__(self, mapped: mmap.mmap):
+        self.mapped = mapped
+        super().__init__(REGION_SEPARATOR.join(
+            self.decode(start, end) for start, end in self.regions()))
+
+    def close(self) -> None:
+        self.mapped.close()
+
+    def boundary(self, offset: int) -> int:
+        """
+        Move the byte offset forward to the nearest character boundary,
+        not splitting a CRLF line break either.
+        """
+
+        size = len(self.mapped)
+        offset = max(0, min(offset, size))
+
+        while offset < size and self.mapped[offset] & 0xC0 == 0x80:
+            offset += 1
+        if 0 < offset < size and \
+                self.mapped[offset - 1:offset + 1] == b"\r\n":
+            offset += 1
+
+        return offset
+
+    def release(self, start: int, end: int) -> None:
+        """
+        Let the pages of the mapped file between the byte offsets be evicted
+        from the memory, if the platform supports it. The start offset must
+        be aligned to the page size.
+        """
+
+        if hasattr(mmap, "MADV_DONTNEED"):
+            end = min(end, len(self.mapped))
+            if start < end:
+                self.mapped.madvise(mmap.MADV_DONTNEED, start, end - start)
+
+    def decode(self, start: int, end: int) -> str:
+        """Decode the text between the byte offsets."""
+
+        start = self.boundary(start)
+        end = max(start, self.boundary(end))
+        return translate_newlines(str(self.mapped[start:end], "utf8"))
+
+    def regions(self) -> List[Tuple[int, int]]:
+        """The sorted, non-overlapping byte ranges of the decoded regions."""
+
+        size = len(self.mapped)
+        regions = [(0, HEAD_SIZE), (size - TAIL_SIZE, size)]
+
+        for offset in range(HEAD_SIZE, size, SCAN_CHUNK_SIZE):
+            if len(regions) - 2 >= MAX_ANCHOR_WINDOWS:
+                break
+
+            # Anchors overlapping the end of the chunk are found in the next.
+            anchors = RE_REGION_ANCHORS.finditer(
+                self.mapped, offset,
+                min(size, offset + SCAN_CHUNK_SIZE + SCAN_CHUNK_OVERLAP))
+            for anchor in anchors:
+                if anchor.start() >= offset + SCAN_CHUNK_SIZE or \
+                        len(regions) - 2 >= MAX_ANCHOR_WINDOWS:
+                    break
+                regions.append((anchor.start(),
+                                anchor.start() + ANCHOR_WINDOW_SIZE))
+
+            self.release(offset, offset + SCAN_CHUNK_SIZE)
+
+        merged: List[Tuple[int, int]] = []
+        for start, end in sorted(regions):
+            if merged and start <= merged[-1][1]:
+                merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+            else:
+                merged.append((start, end))
+        return merged
+
+    def scan_windows(self) -> Iterator[Tuple[str, int, int]]:
+        for offset in range(0, len(self.mapped), SCAN_CHUNK_SIZE):
+            end = offset + SCAN_CHUNK_SIZE
+            lead = self.decode(offset - SCAN_CHUNK_LEAD, offset)
+            chunk = self.decode(offset, end)
+            overlap = self.decode(end, end + SCAN_CHUNK_OVERLAP)
+            yield lead + chunk + overlap, len(lead), len(lead) + len(chunk)
+            self.release(offset, end)
+
+
+def read_document(file: IO[str]) -> Document:
+    """
+    Read the document from a text stream, which must fit in memory as
+    a whole.
+    """
+
+    plain_text = file.read(MAX_DECODED_SIZE)
+    if len(plain_text) == MAX_DECODED_SIZE:
+        raise MemoryError("File is too large")
+
+    return Document(plain_text)
+
+
+def decode_document(contents: bytes) -> Document:
+    """Decode the document from the contents of a whole file."""
+
+    return Document(translate_newlines(str(contents, "utf8")))
+
+
+def load_document(path: str) -> Document:
+    """
+    Load the document from a file, memory-mapping it if possible. Large
+    documents are decoded only partially, see `MappedDocument`.
+    """
+
+    with open(path, "rb") as file:
+        file_status = os.fstat(file.fileno())
+        # Neither empty files nor pipes and the like can be mapped.
+        if file_status.st_size == 0 or \
+                not stat.S_ISREG(file_status.st_mode):
+            return read_document(io.TextIOWrapper(file, encoding="utf8"))
+
+        mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    if file_status.st_size > MAX_DECODED_SIZE:
+        return MappedDocument(mapped)
+
+    with mapped:
+        return Document(translate_newlines(str(mapped, "utf8")))
@@ -0,0 +1,415 @@
+import bz2
+from collections import OrderedDict
+from document import MAX_DECODED_SIZE, Document, decode_document, \
+    load_document
+import fnmatch
+import gzip
+import io
+import lzma
+import os
+import stat
+import sys
+import tarfile
+import threading
+from typing import IO, Callable, Dict, Iterable, Iterator, List, \
+    NamedTuple, Optional, Tuple, Union
+import zipfile
+
+
+# The files parsed within the given folders, unless given other patterns.
+DEFAULT_INPUT_PATTERN = "*.txt"
+# Stands for standard input in place of the path to a manifest.
+STANDARD_INPUT = "-"
+
+# Separates the path to an archive from the name of a member within it,
+# as in "certificates.zip::2021/1102a_pdf.txt".
+MEMBER_SEPARATOR = "::"
+# The decompressing readers of the compressed files, by their extensions.
+DECOMPRESSORS: Dict[str, Callable[[str], io.BufferedIOBase]] = {
+    ".gz": gzip.GzipFile,
+    ".bz2": bz2.BZ2File,
+    ".xz": lzma.LZMAFile,
+}
+ZIP_EXTENSIONS = (".zip",)
+TAR_EXTENSIONS = (".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tbz2", ".tar.xz",
+                  ".txz")
+# The number of archives kept open by each process.
+OPEN_ARCHIVES = 4
+
+
+class InputFile(NamedTuple):
+    """
+    An input file, together with the name of its output, without
+    an extension. The name is relative to the given folder the file was
+    found in, so that the files of the same name in different subfolders
+    do not share it.
+    """
+
+    path: str
+    name: str
+
+
+def is_zip(path: str) -> bool:
+    return path.lower().endswith(ZIP_EXTENSIONS)
+
+
+def is_archive(path: str) -> bool:
+    """Whether the path is of a zip or a tar archive, by its extension."""
+
+    return is_zip(path) or path.lower().endswith(TAR_EXTENSIONS)
+
+
+def compression_of(path: str) -> Optional[str]:
+    """The extension of a compressed file, None if it is not one."""
+
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in DECOMPRESSORS or is_archive(path):
+        return None
+    return extension
+
+
+def split_member(path: str) -> Optional[Tuple[str, str]]:
+    """
+    The path to the archive and the name of the member, if the path is of
+    an archive member.
+    """
+
+    archive, separator, member = path.partition(MEMBER_SEPARATOR)
+    if not separator or not is_archive(archive):
+        return None
+    return archive, member
+
+
+def output_name(path: str) -> str:
+    """
+    The name of the output of a file, or of an archive member, without any
+    extension, including that of its compression.
+    """
+
+    name = os.path.basename(path)
+    compression = compression_of(name)
+    if compression is not None:
+        name = name[:-len(compression)]
+    return os.path.splitext(name)[0]
+
+
+def matches(name: str, patterns: List[str]) -> bool:
+    """
+    Whether the name matches any of the glob patterns, either as it is or
+    without the extension of its compression.
+    """
+
+    compression = compression_of(name)
+    names = [name] if compression is None \
+        else [name, name[:-len(compression)]]
+    return any(fnmatch.fnmatch(candidate, pattern)
+               for candidate in names for pattern in patterns)
+
+
+def direct_input(path: str) -> InputFile:
+    """
+    An input file given directly, its output named after the file, or after
+    the member if of an archive.
+    """
+
+    member = split_member(path)
+    name = member[1] if member is not None else path
+    return InputFile(path, output_name(name))
+
+
+def archive_members(archive: str, patterns: List[str], prefix: str = "") \
+        -> Iterator[InputFile]:
+    """
+    Produce the files within the archive whose names match any of the glob
+    patterns, in the order they are stored in, their outputs named after
+    the members. Tar archives are listed lazily, as they are read. Hidden
+    files are skipped, so are the archives which cannot be read,
+    reporting them.
+    """
+
+    def member_input(name: str) -> Optional[InputFile]:
+        base_name = os.path.basename(name)
+        if base_name.startswith(".") or not matches(base_name, patterns):
+            return None
+        return InputFile(archive + MEMBER_SEPARATOR + name,
+                         prefix + output_name(base_name))
+
+    try:
+        if is_zip(archive):
+            with zipfile.ZipFile(archive) as zip_file:
+                members = [info.filename for info in zip_file.infolist()
+                           if not info.is_dir()]
+            for name in members:
+                input_file = member_input(name)
+                if input_file is not None:
+                    yield input_file
+            return
+
+        # Read as a stream, without seeking back, so that a compressed
+        # archive is decompressed only once.
+        with tarfile.open(archive, "r|*") as tar_file:
+            for info in tar_file:
+                input_file = member_input(info.name) if info.isfile() \
+                    else None
+                if input_file is not None:
+                    yield input_file
+    except (OSError, EOFError, zipfile.BadZipFile, tarfile.TarError) as e:
+        print(f"Skipping archive '{archive}': {e}", file=sys.stderr)
+
+
+def scan_folder(folder: str, patterns: List[str], recursive: bool = False,
+                prefix: str = "") -> Iterator[InputFile]:
+    """
+    Produce the files of the folder whose names match any of the glob
+    patterns, in the order they are listed in, lazily, so that the first
+    ones are parsed while the rest are still being listed. The subfolders
+    are scanned too if `recursive`, except for symbolic links to them,
+    and so are the members of the archives, see `archive_members`.
+    Hidden files and folders are skipped, so are the folders which cannot
+    be listed, reporting them.
+    """
+
+    try:
+        entries = os.scandir(folder)
+    except OSError as e:
+        print(f"Skipping folder '{folder}': {e}", file=sys.stderr)
+        return
+
+    with entries:
+        for entry in entries:
+            if entry.name.startswith("."):
+                continue
+            try:
+                is_folder = entry.is_dir(follow_symlinks=False)
+                is_file = not is_folder and entry.is_file()
+            except OSError:
+                # Removed in the meantime.
+                continue
+
+            if is_folder and recursive:
+                yield from scan_folder(entry.path, patterns, recursive,
+                                       prefix + entry.name + os.sep)
+            elif is_file and is_archive(entry.name):
+                yield from archive_members(entry.path, patterns, prefix)
+            elif is_file and matches(entry.name, patterns):
+                yield InputFile(entry.path, prefix + output_name(entry.name))
+
+
+def read_manifest(path: str) -> Iterator[str]:
+    """
+    Produce the paths listed in the manifest file, one per line, or in
+    standard input for "-", lazily. Empty lines are skipped.
+    """
+
+    if path == STANDARD_INPUT:
+        yield from (line.rstrip("\r\n") for line in sys.stdin
+                    if line.strip())
+        return
+
+    with open(path, "r", encoding="utf8") as file:
+        yield from (line.rstrip("\r\n") for line in file if line.strip())
+
+
+def discover_inputs(paths: Iterable[str], patterns: List[str],
+                    recursive: bool = False) -> Iterator[InputFile]:
+    """
+    Produce the input files given by the paths, lazily: the files as they
+    are, and the files of the folders and the archives matching
+    the patterns, see `scan_folder` and `archive_members`.
+    """
+
+    for path in paths:
+        if os.path.isdir(path):
+            yield from scan_folder(path, patterns, recursive)
+        elif is_archive(path) and os.path.isfile(path):
+            yield from archive_members(path, patterns)
+        else:
+            # Reported as any other input file which cannot be read.
+            yield direct_input(path)
+
+
+class TarArchive:
+    """
+    A tar archive opened for reading its members, looking each one up only
+    as far as needed from the last one, so that members read in the order
+    they are stored in decompress the archive only once.
+    """
+
+    def __init__(self, path: str):
+        self.tar_file = tarfile.open(path, "r:*")
+        # The members passed so far, by their names.
+        self.members: Dict[str, tarfile.TarInfo] = {}
+
+    def open(self, name: str) -> IO[bytes]:
+        member = self.members.get(name)
+        while member is None:
+            info = self.tar_file.next()
+            if info is None:
+                raise KeyError(name)
+            self.members[info.name] = info
+            if info.name == name:
+                member = info
+
+        file = self.tar_file.extractfile(member)
+        if file is None:
+            raise KeyError(name)
+        return file
+
+    def close(self) -> None:
+        self.tar_file.close()
+
+
+def read_limited(file: Union[IO[bytes], io.BufferedIOBase]) -> bytes:
+    """
+    Read the whole decompressed stream, which must fit in memory as
+    a whole, see `document.read_document`.
+    """
+
+    contents = file.read(MAX_DECODED_SIZE)
+    if len(contents) == MAX_DECODED_SIZE:
+        raise MemoryError("File is too large")
+    return contents
+
+
+class OpenArchive:
+    """
+    An archive kept open by this process for reading its members, one at
+    a time, as a tar archive is read from a single position. Once closed,
+    its members are no longer read, and it has to be opened again.
+    """
+
+    def __init__(self, path: str):
+        self.archive: Union[zipfile.ZipFile, TarArchive] = \
+            zipfile.ZipFile(path) if is_zip(path) else TarArchive(path)
+        self.lock = threading.Lock()
+        self.closed = False
+
+    def read(self, name: str) -> Optional[bytes]:
+        """The contents of the member, None if the archive was closed."""
+
+        with self.lock:
+            if self.closed:
+                return None
+            with self.archive.open(name) as file:
+                return read_limited(file)
+
+    def close(self) -> None:
+        """Close the archive, once its member being read, if any, is read."""
+
+        with self.lock:
+            self.closed = True
+            self.archive.close()
+
+
+# The archives opened by this process, the least recently used first, by
+# their paths, modification times and sizes, so that a changed archive is
+# opened again.
+ARCHIVES: "OrderedDict[Tuple[str, int, int], OpenArchive]" = OrderedDict()
+# Guards the open archives, shared by the threads of the pipeline. Their
+# members are read under the lock of each archive instead, so that
+# different archives are read at once.
+ARCHIVES_LOCK = threading.Lock()
+
+
+def open_archive(archive: str) -> OpenArchive:
+    """
+    The archive kept open by this process, opening it if it is not yet, and
+    closing the least recently used one if there are too many open.
+    """
+
+    archive_status = os.stat(archive)
+    key = (archive, archive_status.st_mtime_ns, archive_status.st_size)
+
+    with ARCHIVES_LOCK:
+        opened = ARCHIVES.get(key)
+        if opened is not None:
+            ARCHIVES.move_to_end(key)
+            return opened
+
+    # Opened outside of the lock, as it means reading the list of members.
+    opening = OpenArchive(archive)
+    evicted = []
+
+    with ARCHIVES_LOCK:
+        opened = ARCHIVES.get(key)
+        if opened is None:
+            opened = ARCHIVES[key] = opening
+            while len(ARCHIVES) > OPEN_ARCHIVES:
+                evicted.append(ARCHIVES.popitem(last=False)[1])
+        else:
+            # Opened by another thread in the meantime.
+            evicted.append(opening)
+        ARCHIVES.move_to_end(key)
+
+    for unused in evicted:
+        unused.close()
+    return opened
+
+
+def read_member(archive: str, name: str) -> bytes:
+    """
+    Read a member of the archive, keeping the archive open for the next
+    members, as opening an archive means reading its whole list of members.
+    """
+
+    try:
+        while True:
+            contents = open_archive(archive).read(name)
+            if contents is not None:
+                return contents
+            # Closed by another thread in the meantime.
+    except KeyError:
+        raise FileNotFoundError(
+            f"No member '{name}' in archive '{archive}'") from None
+
+
+def is_packed(path: str) -> bool:
+    """Whether the path is of a compressed file or an archive member."""
+
+    return split_member(path) is not None or compression_of(path) is not None
+
+
+def read_packed(path: str) -> bytes:
+    """
+    Read the decompressed contents of a compressed file or of an archive
+    member, see `is_packed`.
+    """
+
+    member = split_member(path)
+    if member is not None:
+        return read_member(*member)
+
+    compression = compression_of(path)
+    if compression is None:
+        raise ValueError(f"File '{path}' is not compressed")
+    with DECOMPRESSORS[compression](path) as file:
+        return read_limited(file)
+
+
+def read_input(path: str) -> Optional[bytes]:
+    """
+    Read the contents of the input file, decompressed if packed. None for
+    plain files too large to be decoded as a whole, which are left to be
+    loaded by the parsing, see `document.load_document`.
+    """
+
+    if is_packed(path):
+        return read_packed(path)
+
+    with open(path, "rb") as file:
+        file_status = os.fstat(file.fileno())
+        if stat.S_ISREG(file_status.st_mode) and \
+                file_status.st_size > MAX_DECODED_SIZE:
+            return None
+        return file.read()
+
+
+def load_input(path: str) -> Document:
+    """
+    Load the document from an input file, decompressing it if packed,
+    see `is_packed`, otherwise as `document.load_document` does.
+    """
+
+    if is_packed(path):
+        return decode_document(read_packed(path))
+    return load_document(path)
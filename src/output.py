@@ -0,0 +1,257 @@
+from abc import ABC, abstractmethod
+import gzip
+import io
+import json
+import os
+import re
+import sqlite3
+import sys
+import uuid
+from typing import IO, Dict, List, Optional, Tuple, cast
+
+
+OUTPUT_FORMATS = ["json", "jsonl", "sqlite"]
+
+# The size of the buffer of the results written into a single stream.
+WRITE_BUFFER_SIZE = 1024 * 1024
+
+# The number of results written into a database in a single transaction.
+SQLITE_BATCH_SIZE = 1000
+
+# The tables of the sqlite format: a row for each document, with its whole
+# result in JSON, and a row for each item of its fields, referring to it.
+# The versions are looked up by their family and by their keys, a row for
+# each key, see `version_keys`.
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    id INTEGER PRIMARY KEY,
+    source TEXT NOT NULL UNIQUE,
+    title TEXT,
+    result TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS versions (
+    document INTEGER NOT NULL REFERENCES documents (id) ON DELETE CASCADE,
+    family TEXT NOT NULL COLLATE NOCASE,
+    value TEXT NOT NULL,
+    key TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS versions_by_family ON versions (family, key);
+CREATE INDEX IF NOT EXISTS versions_by_key ON versions (key);
+CREATE INDEX IF NOT EXISTS versions_by_document ON versions (document);
+CREATE TABLE IF NOT EXISTS table_of_contents (
+    document INTEGER NOT NULL REFERENCES documents (id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    section TEXT,
+    title TEXT,
+    page INTEGER
+);
+CREATE INDEX IF NOT EXISTS table_of_contents_by_document
+    ON table_of_contents (document);
+CREATE TABLE IF NOT EXISTS revisions (
+    document INTEGER NOT NULL REFERENCES documents (id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    version TEXT,
+    date TEXT,
+    description TEXT
+);
+CREATE INDEX IF NOT EXISTS revisions_by_document ON revisions (document);
+CREATE TABLE IF NOT EXISTS bibliography (
+    document INTEGER NOT NULL REFERENCES documents (id) ON DELETE CASCADE,
+    key TEXT NOT NULL,
+    reference TEXT
+);
+CREATE INDEX IF NOT EXISTS bibliography_by_document ON bibliography (document);
+"""
+
+# The characters a version is spelled with or without, as in RSA-2048,
+# RSA_2048, RSA 2048 and RSA2048.
+RE_VERSION_SEPARATORS = re.compile(r"[\s_-]+")
+RE_VERSION_NAME = re.compile(r"[A-Z]*")
+
+
+class ResultWriter(ABC):
+    """
+    A destination the results of all the documents are written into,
+    in the order of their writing, as opposed to a file for each of them.
+    """
+
+    @abstractmethod
+    def write(self, source: str, result: Dict) -> None:
+        """Write the result of the document read from the source."""
+
+    def flush(self) -> None:
+        """Make sure the results written so far are stored."""
+
+    def close(self) -> None:
+        """Finish writing, making sure all the results are stored."""
+
+    def __enter__(self) -> "ResultWriter":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+class JsonLinesWriter(ResultWriter):
+    """
+    Writes each result as a compact JSON object on a single line, with
+    the path of its document under "source", followed by the fields.
+    The stream is compressed by gzip if its path ends with ".gz".
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self.standard_output = path is None or path == "-"
+        self.file: IO[str]
+
+        if path is None or path == "-":
+            # Written in UTF-8 regardless of the locale, like the files.
+            sys.stdout.flush()
+            self.file = io.TextIOWrapper(sys.stdout.buffer, encoding="utf8")
+        elif path.endswith(".gz"):
+            self.file = gzip.open(path, "wt", encoding="utf8")
+        else:
+            self.file = open(path, "w", encoding="utf8",
+                             buffering=WRITE_BUFFER_SIZE)
+
+    def write(self, source: str, result: Dict) -> None:
+        record = {"source": source}
+        record.update(result)
+        self.file.write(json.dumps(record, ensure_ascii=False,
+                                   separators=(",", ":")))
+        self.file.write("\n")
+
+    def flush(self) -> None:
+        self.file.flush()
+
+    def close(self) -> None:
+        if self.standard_output:
+            # Standard output stays open for the rest of the program.
+            self.file.flush()
+            cast(io.TextIOWrapper, self.file).detach()
+        else:
+            self.file.close()
+
+
+def version_keys(value: str) -> List[str]:
+    """
+    The keys a version is looked up by: its value in uppercase, without
+    the whitespace, the dashes and the underscores, a key for each of
+    the versions combined by slashes. The numbers following a slash are
+    named as the first version, as RSA2048 and RSA4096 of RSA 2048/4096.
+    """
+
+    parts = RE_VERSION_SEPARATORS.sub("", value).upper().split("/")
+    name = RE_VERSION_NAME.match(parts[0])
+    prefix = name.group() if name is not None else ""
+    keys = [parts[0]] + [prefix + part if part.isdigit() else part
+                         for part in parts[1:]]
+    return list(dict.fromkeys(key for key in keys if key))
+
+
+class SqliteWriter(ResultWriter):
+    """
+    Writes the results into the tables of an SQLite database, see
+    `SQLITE_SCHEMA`, in a transaction for every `SQLITE_BATCH_SIZE` of
+    them, so that the whole corpus is queried by its indexes instead of
+    reading each result again. The result of a document written again
+    replaces the previous one.
+    """
+
+    def __init__(self, path: str):
+        self.connection = sqlite3.connect(path)
+        # Readers are not blocked by the writing, and the other way round.
+        self.connection.execute("PRAGMA journal_mode = WAL")
+        self.connection.execute("PRAGMA synchronous = NORMAL")
+        self.connection.execute("PRAGMA foreign_keys = ON")
+        self.connection.executescript(SQLITE_SCHEMA)
+        self.pending: List[Tuple[str, Dict]] = []
+
+    def write(self, source: str, result: Dict) -> None:
+        self.pending.append((source, result))
+        if len(self.pending) >= SQLITE_BATCH_SIZE:
+            self.flush()
+
+    def insert(self, source: str, result: Dict) -> None:
+        """Insert the rows of a single result, replacing any previous one."""
+
+        self.connection.execute("DELETE FROM documents WHERE source = ?",
+                                (source,))
+        document = self.connection.execute(
+            "INSERT INTO documents (source, title, result) VALUES (?, ?, ?)",
+            (source, result.get("title"),
+             json.dumps(result, ensure_ascii=False,
+                        separators=(",", ":")))).lastrowid
+
+        self.connection.executemany(
+            "INSERT INTO versions VALUES (?, ?, ?, ?)",
+            [(document, family, value, key)
+             for family, values in result.get("versions", {}).items()
+             for value in values for key in version_keys(value)])
+        self.connection.executemany(
+            "INSERT INTO table_of_contents VALUES (?, ?, ?, ?, ?)",
+            [(document, position, *entry)
+             for position, entry
+             in enumerate(result.get("table_of_contents", []))])
+        self.connection.executemany(
+            "INSERT INTO revisions VALUES (?, ?, ?, ?, ?)",
+            [(document, position, revision.get("version"),
+              revision.get("date"), revision.get("description"))
+             for position, revision
+             in enumerate(result.get("revisions", []))])
+        self.connection.executemany(
+            "INSERT INTO bibliography VALUES (?, ?, ?)",
+            [(document, key, reference)
+             for key, reference in result.get("bibliography", {}).items()])
+
+    def flush(self) -> None:
+        if not self.pending:
+            return
+
+        with self.connection:
+            for source, result in self.pending:
+                self.insert(source, result)
+        self.pending = []
+
+    def close(self) -> None:
+        try:
+            self.flush()
+        finally:
+            self.connection.close()
+
+
+def write_atomically(path: str, text: str) -> None:
+    """
+    Write the text into the file at the path atomically, through
+    a temporary file in the same folder, so that the file is never seen
+    partially written, even if the writing is interrupted.
+    """
+
+    # Created like the file itself, with the permissions given by umask.
+    temporary_path = f"{path}.{uuid.uuid4().hex[:12]}.tmp"
+    file = open(temporary_path, "x", encoding="utf8")
+
+    try:
+        with file:
+            file.write(text)
+        os.replace(temporary_path, path)
+    except BaseException:
+        os.unlink(temporary_path)
+        raise
+
+
+def open_writer(output_format: str, path: Optional[str] = None) \
+        -> Optional[ResultWriter]:
+    """
+    Open the writer of the given output format into the path, standard
+    output by default. None for the default format, where each result is
+    written into its own file instead.
+    """
+
+    if output_format == "jsonl":
+        return JsonLinesWriter(path)
+    if output_format == "sqlite":
+        if path is None or path == "-":
+            raise ValueError("The sqlite format is written into a file only")
+        return SqliteWriter(path)
+    return None
@@ -0,0 +1,83 @@
+from concurrent.futures import FIRST_COMPLETED, Future, \
+    ProcessPoolExecutor, wait
+import itertools
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, \
+    Tuple, TypeVar
+
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+# The number of chunks submitted ahead of the consumer, per worker.
+DEFAULT_PREFETCH_PER_JOB = 4
+
+
+def call_chunk(function: Callable[[T], R], chunk: List[T]) -> List[R]:
+    """Call the function on each item of the chunk, run by a worker."""
+
+    return [function(item) for item in chunk]
+
+
+def chunked(items: Iterable[T], size: int) -> Iterator[List[T]]:
+    """Split the items lazily into lists of the given size."""
+
+    iterator = iter(items)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def bounded_map(function: Callable[[T], R], items: Iterable[T],
+                jobs: int = 1, ordered: bool = True,
+                prefetch: Optional[int] = None, chunk_size: int = 1) \
+        -> Iterator[Tuple[T, R]]:
+    """
+    Call the function on each item by a pool of `jobs` worker processes,
+    yielding each item together with its result as soon as it is
+    available, in the order of the items if `ordered`, or in the order
+    of completion otherwise. The function must be picklable.
+
+    The items are submitted in chunks of `chunk_size`, with at most
+    `prefetch` chunks ahead of the consumer, 4 per worker by default, so
+    the items are consumed lazily and the memory stays flat even for
+    arbitrarily long iterables. A single job runs in this process.
+    """
+
+    if jobs == 1:
+        for item in items:
+            yield item, function(item)
+        return
+
+    if prefetch is None:
+        prefetch = jobs * DEFAULT_PREFETCH_PER_JOB
+    chunks = chunked(items, chunk_size)
+    # Ordered by submission, as dictionaries keep the order of insertion.
+    submitted: Dict["Future[List[R]]", List[T]] = {}
+    executor = ProcessPoolExecutor(jobs)
+
+    def submit(count: int) -> None:
+        for chunk in itertools.islice(chunks, count):
+            submitted[executor.submit(call_chunk, function, chunk)] = chunk
+
+    try:
+        submit(max(1, prefetch))
+
+        while submitted:
+            if ordered:
+                done = [next(iter(submitted))]
+            else:
+                done = list(wait(submitted, return_when=FIRST_COMPLETED)[0])
+
+            for future in done:
+                results = future.result()
+                chunk = submitted.pop(future)
+                # Refilled before yielding, so the workers stay busy while
+                # the consumer processes the results.
+                submit(1)
+                yield from zip(chunk, results)
+    finally:
+        # Left early by the consumer, the chunks not yet started are
+        # dropped instead of being waited for.
+        executor.shutdown(wait=True, cancel_futures=True)
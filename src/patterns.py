@@ -0,0 +1,172 @@
+import re
+import sys
+import time
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, \
+    Optional, Union
+
+
+class PatternUse(NamedTuple):
+    """The recorded use of a single pattern."""
+
+    calls: int
+    matches: int
+    seconds: float
+
+
+class Pattern:
+    """
+    A named regular expression, compiled once when registered. Each call
+    is recorded while the registry is recording, so that the cost of
+    the pattern can be attributed to it.
+    """
+
+    def __init__(self, registry: "PatternRegistry", name: str,
+                 pattern: str, flags: int = 0):
+        self.registry = registry
+        self.name = name
+        self.regex = re.compile(pattern, flags)
+        self.calls = 0
+        self.matches = 0
+        self.seconds = 0.0
+
+    @property
+    def pattern(self) -> str:
+        return self.regex.pattern
+
+    def record(self, matches: int, start: float) -> None:
+        self.calls += 1
+        self.matches += matches
+        self.seconds += time.perf_counter() - start
+
+    def search(self, string: str, pos: int = 0, endpos: int = sys.maxsize) \
+            -> Optional["re.Match[str]"]:
+        if not self.registry.recording:
+            return self.regex.search(string, pos, endpos)
+
+        start = time.perf_counter()
+        match = self.regex.search(string, pos, endpos)
+        self.record(match is not None, start)
+        return match
+
+    def match(self, string: str, pos: int = 0, endpos: int = sys.maxsize) \
+            -> Optional["re.Match[str]"]:
+        if not self.registry.recording:
+            return self.regex.match(string, pos, endpos)
+
+        start = time.perf_counter()
+        match = self.regex.match(string, pos, endpos)
+        self.record(match is not None, start)
+        return match
+
+    def findall(self, string: str, pos: int = 0,
+                endpos: int = sys.maxsize) -> List[Any]:
+        if not self.registry.recording:
+            return self.regex.findall(string, pos, endpos)
+
+        start = time.perf_counter()
+        found = self.regex.findall(string, pos, endpos)
+        self.record(len(found), start)
+        return found
+
+    def finditer(self, string: str, pos: int = 0,
+                 endpos: int = sys.maxsize) -> Iterator["re.Match[str]"]:
+        if not self.registry.recording:
+            return self.regex.finditer(string, pos, endpos)
+        return self.recorded_finditer(string, pos, endpos)
+
+    def recorded_finditer(self, string: str, pos: int, endpos: int) \
+            -> Iterator["re.Match[str]"]:
+        # The time is measured only while looking for each match, not while
+        # the caller processes it.
+        start = time.perf_counter()
+        matches = self.regex.finditer(string, pos, endpos)
+        seconds = time.perf_counter() - start
+        count = 0
+
+        try:
+            while True:
+                start = time.perf_counter()
+                match = next(matches, None)
+                seconds += time.perf_counter() - start
+                if match is None:
+                    break
+                count += 1
+                yield match
+        finally:
+            self.calls += 1
+            self.matches += count
+            self.seconds += seconds
+
+    def sub(self, repl: Union[str, Callable[["re.Match[str]"], str]],
+            string: str, count: int = 0) -> str:
+        if not self.registry.recording:
+            return self.regex.sub(repl, string, count)
+
+        start = time.perf_counter()
+        result, replaced = self.regex.subn(repl, string, count)
+        self.record(replaced, start)
+        return result
+
+    def split(self, string: str, maxsplit: int = 0) -> List[Any]:
+        if not self.registry.recording:
+            return self.regex.split(string, maxsplit)
+
+        start = time.perf_counter()
+        parts = self.regex.split(string, maxsplit)
+        self.record(len(parts) - 1, start)
+        return parts
+
+    def use(self) -> PatternUse:
+        return PatternUse(self.calls, self.matches, self.seconds)
+
+
+class PatternRegistry:
+    """
+    All the regular expressions of the parsers, by their unique names, so
+    that they are compiled once and can be audited in one place.
+    """
+
+    def __init__(self) -> None:
+        self.patterns: Dict[str, Pattern] = {}
+        # Whether the calls of the patterns are recorded. Recording adds
+        # a little overhead to each call.
+        self.recording = False
+
+    def compile(self, name: str, pattern: str, flags: int = 0) -> Pattern:
+        if name in self.patterns:
+            raise ValueError(f"Pattern '{name}' is already registered")
+
+        compiled = Pattern(self, name, pattern, flags)
+        self.patterns[name] = compiled
+        return compiled
+
+    def usage(self) -> Dict[str, PatternUse]:
+        """The use of each pattern recorded so far."""
+
+        return {name: pattern.use()
+                for name, pattern in self.patterns.items()}
+
+
+REGISTRY = PatternRegistry()
+
+
+def compile(name: str, pattern: str, flags: int = 0) -> Pattern:
+    """Compile and register a pattern under a unique name."""
+
+    return REGISTRY.compile(name, pattern, flags)
+
+
+def usage_difference(before: Dict[str, PatternUse],
+                     after: Dict[str, PatternUse]) -> Dict[str, PatternUse]:
+    """The use of the patterns used in between the two recorded usages."""
+
+    difference = {}
+
+    for name, use in after.items():
+        previous = before.get(name, PatternUse(0, 0, 0.0))
+        if use.calls != previous.calls:
+            difference[name] = PatternUse(use.calls - previous.calls,
+                                          use.matches - previous.matches,
+                                          use.seconds - previous.seconds)
+
+    return difference
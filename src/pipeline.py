@@ -0,0 +1,173 @@
+import asyncio
+from concurrent.futures import Executor, ProcessPoolExecutor, \
+    ThreadPoolExecutor
+from output import write_atomically
+from typing import Callable, Generic, Iterable, Optional, Tuple, \
+    TypeVar
+
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+# The number of input files read ahead of the parsing.
+DEFAULT_READ_AHEAD = 16
+# The number of output files being written at once, behind the reporting.
+DEFAULT_WRITE_BEHIND = 16
+# The number of documents queued for the parsing, per worker, so that
+# a worker does not wait for the next one.
+PARSE_QUEUE_PER_JOB = 2
+
+# The end of the items in a queue between the stages.
+END = None
+
+
+def failed(error: Exception) -> "asyncio.Future":
+    """A completed future, failed with the error."""
+
+    future = asyncio.get_running_loop().create_future()
+    future.set_exception(error)
+    return future
+
+
+class Pipeline(Generic[T, R]):
+    """
+    Overlaps the reading of the input files, their parsing and the writing
+    of their outputs, as stages connected by bounded queues, so that
+    the workers do not wait for slow storage, nor the storage for the
+    workers. The reading and the writing run in threads, at most
+    `read_ahead` files ahead of the parsing and `write_behind` files
+    behind it, and the parsing in `jobs` worker processes.
+
+    Each item is read by `read`, passed along with its contents to `parse`,
+    which must be picklable, and which produces the result together with
+    the output path and the output to write, if any. The results are
+    passed to `report` in the order of the items, once their outputs are
+    written. An error of any stage is turned into the result of the item
+    by `fail`.
+    """
+
+    def __init__(self, read: Callable[[T], Optional[bytes]],
+                 parse: Callable[[T, Optional[bytes]],
+                                 Tuple[R, Optional[Tuple[str, str]]]],
+                 report: Callable[[T, R], None],
+                 fail: Callable[[T, Exception], R], jobs: int = 1,
+                 read_ahead: int = DEFAULT_READ_AHEAD,
+                 write_behind: int = DEFAULT_WRITE_BEHIND):
+        self.read = read
+        self.parse = parse
+        self.report = report
+        self.fail = fail
+        self.jobs = jobs
+        self.read_ahead = read_ahead
+        self.write_behind = write_behind
+
+    def run(self, items: Iterable[T]) -> None:
+        """Process all the items, returning once all are reported."""
+
+        asyncio.run(self.process(items))
+
+    async def process(self, items: Iterable[T]) -> None:
+        # Each queue holds the pending work of the next stage, in the order
+        # of the items, so that the work is overlapped but its results are
+        # still taken in order.
+        read_queue: "asyncio.Queue" = asyncio.Queue(self.read_ahead)
+        parse_queue: "asyncio.Queue" = asyncio.Queue(
+            self.jobs * PARSE_QUEUE_PER_JOB)
+        write_queue: "asyncio.Queue" = asyncio.Queue(self.write_behind)
+
+        io_executor = ThreadPoolExecutor(self.read_ahead + self.write_behind)
+        # The items are taken in a thread of their own, as taking them may
+        # block, e.g. when listing a folder, and one by one, in their order.
+        items_executor = ThreadPoolExecutor(1)
+        # Processes even for a single job, as the time budget of the parsers
+        # is only enforced in the main thread of a process.
+        parse_executor = ProcessPoolExecutor(self.jobs)
+
+        stages = [
+            asyncio.ensure_future(stage) for stage in (
+                self.read_stage(items, items_executor, io_executor,
+                                read_queue),
+                self.parse_stage(read_queue, parse_executor, parse_queue),
+                self.write_stage(parse_queue, io_executor, write_queue),
+                self.report_stage(write_queue),
+            )]
+
+        try:
+            await asyncio.gather(*stages)
+        finally:
+            for stage in stages:
+                stage.cancel()
+            # The work not yet started is dropped if a stage failed.
+            parse_executor.shutdown(wait=True, cancel_futures=True)
+            io_executor.shutdown(wait=True, cancel_futures=True)
+            items_executor.shutdown(wait=True, cancel_futures=True)
+
+    def run_in(self, executor: Executor, function: Callable, *args) \
+            -> "asyncio.Future":
+        return asyncio.get_running_loop().run_in_executor(
+            executor, function, *args)
+
+    async def read_stage(self, items: Iterable[T], items_executor: Executor,
+                         executor: Executor,
+                         read_queue: "asyncio.Queue") -> None:
+        iterator = iter(items)
+        while True:
+            item = await self.run_in(items_executor, next, iterator, END)
+            if item is END:
+                break
+            await read_queue.put((item, self.run_in(executor, self.read,
+                                                    item)))
+        await read_queue.put(END)
+
+    async def parse_stage(self, read_queue: "asyncio.Queue",
+                          executor: Executor,
+                          parse_queue: "asyncio.Queue") -> None:
+        while True:
+            entry = await read_queue.get()
+            if entry is END:
+                break
+
+            item, reading = entry
+            try:
+                contents = await reading
+            except Exception as e:
+                await parse_queue.put((item, failed(e)))
+                continue
+
+            await parse_queue.put(
+                (item, self.run_in(executor, self.parse, item, contents)))
+        await parse_queue.put(END)
+
+    async def write_stage(self, parse_queue: "asyncio.Queue",
+                          executor: Executor,
+                          write_queue: "asyncio.Queue") -> None:
+        while True:
+            entry = await parse_queue.get()
+            if entry is END:
+                break
+
+            item, parsing = entry
+            try:
+                result, output = await parsing
+            except Exception as e:
+                await write_queue.put((item, self.fail(item, e), None))
+                continue
+
+            writing = self.run_in(executor, write_atomically, *output) \
+                if output is not None else None
+            await write_queue.put((item, result, writing))
+        await write_queue.put(END)
+
+    async def report_stage(self, write_queue: "asyncio.Queue") -> None:
+        while True:
+            entry = await write_queue.get()
+            if entry is END:
+                break
+
+            item, result, writing = entry
+            if writing is not None:
+                try:
+                    await writing
+                except Exception as e:
+                    result = self.fail(item, e)
+            self.report(item, result)
@@ -1,6 +1,5 @@
-from functools import partial
 import re
-from typing import Dict, List, Tuple, Union
+from typing import Any, Callable, Dict, List, Mapping, Tuple, Union
 
 
 def pretty_field_name(field: str) -> str:
@@ -86,13 +85,13 @@ def pretty_print_bibliography(data: Dict[str, str]) -> None:
         print(key.ljust(labels_size), text, sep=" " * 4)
 
 
-def pretty_print(data, fields: List[str]) -> None:
-    pretty_printing_functions = {
-        "title": partial(pretty_print_title, data["title"]),
-        "versions": partial(pretty_print_versions, data["versions"]),
-        "table_of_contents": partial(pretty_print_table_of_contents, data["table_of_contents"]),
-        "revisions": partial(pretty_print_revisions, data["revisions"]),
-        "bibliography": partial(pretty_print_bibliography, data["bibliography"])
+def pretty_print(data: Mapping[str, Any], fields: List[str]) -> None:
+    pretty_printing_functions: Dict[str, Callable[[Any], None]] = {
+        "title": pretty_print_title,
+        "versions": pretty_print_versions,
+        "table_of_contents": pretty_print_table_of_contents,
+        "revisions": pretty_print_revisions,
+        "bibliography": pretty_print_bibliography
     }
 
     for i, field in enumerate(fields):
@@ -103,6 +102,6 @@ def pretty_print(data, fields: List[str]) -> None:
         print(pretty_field_name(field) + ":")
 
         if data[field]:
-            pretty_printing_function()
+            pretty_printing_function(data[field])
         else:
             print("Not found.")
@@ -0,0 +1,140 @@
+from document import Document
+import math
+import patterns
+from patterns import PatternUse
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, NamedTuple
+
+
+FieldParser = Callable[[Document], Any]
+
+# Called instead of each field parser, with the field name, the parser and
+# the document to parse, returning the parsed field.
+FieldHook = Callable[[str, FieldParser, Document], Any]
+
+
+class FieldSample(NamedTuple):
+    """The measurements of parsing a single field of a single document."""
+
+    source: str
+    field: str
+    seconds: float
+    regex_calls: int
+    # The peak of memory allocated while parsing, in bytes.
+    peak_memory: int
+    # The use of each registered pattern called while parsing.
+    pattern_uses: Dict[str, PatternUse] = {}
+
+
+class Profiler:
+    """
+    A field hook measuring the wall time, the calls to the registered
+    patterns and the peak allocated memory of each field parser.
+    The measurements are collected under the name of the current source.
+    Recording the calls and tracing the allocations slows the parsers down
+    to some extent.
+    """
+
+    def __init__(self, source: str = ""):
+        self.source = source
+        self.samples: List[FieldSample] = []
+
+    def __call__(self, field: str, field_parser: FieldParser,
+                 document: Document) -> Any:
+        tracing = tracemalloc.is_tracing()
+        if not tracing:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        memory_before = tracemalloc.get_traced_memory()[0]
+        recording = patterns.REGISTRY.recording
+        usage_before = patterns.REGISTRY.usage()
+
+        patterns.REGISTRY.recording = True
+        start = time.perf_counter()
+        try:
+            result = field_parser(document)
+        finally:
+            seconds = time.perf_counter() - start
+            patterns.REGISTRY.recording = recording
+            peak_memory = tracemalloc.get_traced_memory()[1] - memory_before
+            if not tracing:
+                tracemalloc.stop()
+
+        pattern_uses = patterns.usage_difference(
+            usage_before, patterns.REGISTRY.usage())
+        regex_calls = sum(use.calls for use in pattern_uses.values())
+        self.samples.append(FieldSample(self.source, field, seconds,
+                                        regex_calls, peak_memory,
+                                        pattern_uses))
+        return result
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    """The nearest-rank percentile of the sorted values."""
+
+    return values[max(0, math.ceil(fraction * len(values)) - 1)]
+
+
+def print_report(samples: List[FieldSample], slowest_count: int,
+                 file=sys.stderr) -> None:
+    """
+    Print the totals and the percentiles of the measurements per field,
+    the totals per pattern, and the slowest parsed fields.
+    """
+
+    by_field: Dict[str, List[FieldSample]] = {}
+    for sample in samples:
+        by_field.setdefault(sample.field, []).append(sample)
+
+    print("field".ljust(18), "total [s]", "p50 [ms]", "p90 [ms]",
+          "p99 [ms]", "regex calls", "peak [KiB]", sep="  ", file=file)
+
+    for field, field_samples in by_field.items():
+        seconds = sorted(sample.seconds for sample in field_samples)
+        print(field.ljust(18),
+              f"{sum(seconds):9.3f}",
+              *(f"{percentile(seconds, p) * 1000:8.2f}"
+                for p in (0.5, 0.9, 0.99)),
+              f"{sum(s.regex_calls for s in field_samples):11d}",
+              f"{max(s.peak_memory for s in field_samples) / 1024:10.0f}",
+              sep="  ", file=file)
+
+    print_pattern_report(samples, file)
+
+    if slowest_count <= 0:
+        return
+
+    print(file=file)
+    print("slowest:", file=file)
+    slowest = sorted(samples, key=lambda sample: sample.seconds,
+                     reverse=True)[:slowest_count]
+    for sample in slowest:
+        print(f"{sample.seconds * 1000:10.2f} ms",
+              sample.field.ljust(18), sample.source, sep="  ", file=file)
+
+
+def print_pattern_report(samples: List[FieldSample], file=sys.stderr) -> None:
+    """Print the total use of each called pattern, the slowest first."""
+
+    totals: Dict[str, PatternUse] = {}
+    for sample in samples:
+        for name, use in sample.pattern_uses.items():
+            total = totals.get(name, PatternUse(0, 0, 0.0))
+            totals[name] = PatternUse(total.calls + use.calls,
+                                      total.matches + use.matches,
+                                      total.seconds + use.seconds)
+
+    if not totals:
+        return
+
+    print(file=file)
+    print("pattern".ljust(34), "total [s]", "calls", "matches",
+          sep="  ", file=file)
+
+    for name, total in sorted(totals.items(),
+                              key=lambda item: item[1].seconds,
+                              reverse=True):
+        print(name.ljust(34), f"{total.seconds:9.3f}", f"{total.calls:5d}",
+              f"{total.matches:7d}", sep="  ", file=file)
@@ -1,86 +1,581 @@
 #!/usr/bin/env python3
 
 import pretty_printer
+from budget import DEFAULT_FIELD_BUDGET, call_with_budget
+from cache import DEFAULT_CACHE_FOLDER, DEFAULT_CACHE_SIZE, ResultCache, \
+    parser_fingerprint
 from common import parsed_fields_long, parsed_fields_short
+from document import Document, decode_document
+from inputs import DEFAULT_INPUT_PATTERN, STANDARD_INPUT, InputFile, \
+    direct_input, discover_inputs, is_archive, is_packed, load_input, \
+    read_input, read_manifest, read_packed
+from output import OUTPUT_FORMATS, ResultWriter, open_writer, \
+    write_atomically
+from parallel import bounded_map
+from pipeline import DEFAULT_READ_AHEAD, Pipeline
+from profiling import FieldHook, FieldSample, Profiler, print_report
 import title_parser
 import versions_parser
 import table_of_contents_parser
 import revisions_parser
 import bibliography_parser
+from watch import DEFAULT_SETTLE_TIME, DEFAULT_WATCH_INTERVAL, \
+    STATE_FILE_NAME, WatchState, watch
 import argparse
+from functools import partial
 import itertools
 import json
 import os
+import signal
 import sys
-from typing import List
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Mapping, \
+    NamedTuple, Optional, Tuple, Union
 
 
-def parse(plain_text: str):
+FIELD_PARSERS = {
+    "title": title_parser.parse,
+    "versions": versions_parser.parse,
+    "table_of_contents": table_of_contents_parser.parse,
+    "revisions": revisions_parser.parse,
+    "bibliography": bibliography_parser.parse,
+}
+
+# Make the result of a field whose parser exceeded its time budget, a new
+# one each time, so that changing it changes no other result.
+EMPTY_FIELDS: Dict[str, Callable[[], Any]] = {
+    "title": str,
+    "versions": dict,
+    "table_of_contents": list,
+    "revisions": list,
+    "bibliography": dict,
+}
+
+
+class LazyResult(Mapping[str, Any]):
+    """
+    A JSON-corresponding mapping of the parsed fields of a document, where
+    each field is parsed only on its first access. Use `dict` to parse all
+    of them at once, e.g. for serialization.
+
+    A field whose parser runs for longer than the budget in seconds, if
+    given, is left empty and listed in `expired`.
+    """
+
+    def __init__(self, document: Document, fields: List[str],
+                 hook: Optional[FieldHook] = None,
+                 budget: Optional[float] = None):
+        unknown_fields = [f for f in fields if f not in FIELD_PARSERS]
+        if unknown_fields:
+            raise ValueError(f"Unknown fields: {', '.join(unknown_fields)}")
+
+        self.document = document
+        self.fields = fields + ["other"]
+        self.hook = hook
+        self.budget = budget
+        self.parsed: Dict[str, Any] = {"other": []}
+        self.expired: List[str] = []
+
+    def __getitem__(self, field: str) -> Any:
+        if field not in self.parsed:
+            if field not in self.fields:
+                raise KeyError(field)
+
+            field_parser = FIELD_PARSERS[field]
+            if self.hook is not None:
+                field_parser = partial(self.hook, field, field_parser)
+
+            self.parsed[field], expired = call_with_budget(
+                field_parser, self.document, self.budget,
+                EMPTY_FIELDS[field])
+            if expired:
+                self.expired.append(field)
+
+        return self.parsed[field]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.fields)
+
+    def __len__(self) -> int:
+        return len(self.fields)
+
+
+def parse(plain_text: str, hook: Optional[FieldHook] = None,
+          fields: Optional[List[str]] = None,
+          budget: Optional[float] = None) -> Dict:
+    """
+    Parse the plaintext contents of a single document into
+    a JSON-corresponding dictionary, restricted to the given fields.
+    """
+
+    return dict(parse_lazily(plain_text, hook, fields, budget))
+
+
+def parse_lazily(plain_text: str, hook: Optional[FieldHook] = None,
+                 fields: Optional[List[str]] = None,
+                 budget: Optional[float] = None) -> LazyResult:
     """
     Parse the plaintext contents of a single document into
-    a JSON-corresponding dictionary.
+    a JSON-corresponding mapping, restricted to the given fields, each
+    parsed only once accessed, see `LazyResult`.
     """
 
-    return {
-        "title": title_parser.parse(plain_text),
-        "versions": versions_parser.parse(plain_text),
-        "table_of_contents": table_of_contents_parser.parse(plain_text),
-        "revisions": revisions_parser.parse(plain_text),
-        "bibliography": bibliography_parser.parse(plain_text),
-        "other": [],
-    }
+    return parse_document(Document(plain_text), hook, fields, budget)
 
 
-def generate_json_file(sequence_number: int, input_path: str,
-                       output_path: str, pretty_printed_fields: List[str]):
+def parse_document(document: Document, hook: Optional[FieldHook] = None,
+                   fields: Optional[List[str]] = None,
+                   budget: Optional[float] = None) -> LazyResult:
+    """
+    Parse a loaded document into a JSON-corresponding mapping, restricted
+    to the given fields, all of them by default. The hook, if given, is
+    called instead of each field parser, to run it. Each field parser may
+    run for at most the budget in seconds, if given, see `LazyResult`.
+    """
+
+    if fields is None:
+        fields = list(FIELD_PARSERS)
+    return LazyResult(document, fields, hook, budget)
+
+
+def parse_file(input_path: str, fields: Optional[List[str]] = None,
+               budget: Optional[float] = None) -> Dict:
+    """
+    Parse the given fields of a single document file, all of them by
+    default, into a JSON-corresponding dictionary. Each field parser may
+    run for at most the budget in seconds, if given.
+    """
+
+    with load_input(input_path) as document:
+        return dict(parse_document(document, fields=fields, budget=budget))
+
+
+# A document to parse: the path to its file, or a (source, plain text) pair.
+Source = Union[str, Tuple[str, str]]
+
+
+def parse_source(source: Source, fields: Optional[List[str]] = None,
+                 budget: Optional[float] = None) -> Union[Dict, Exception]:
+    """
+    Parse a single document of `parse_many`, returning the error
+    preventing it instead of raising, so that the other documents
+    are still parsed.
+    """
+
+    try:
+        if isinstance(source, str):
+            return parse_file(source, fields, budget)
+        return parse(source[1], fields=fields, budget=budget)
+    except Exception as e:
+        return e
+
+
+def parse_many(sources: Iterable[Source], jobs: int = 1,
+               ordered: bool = True, prefetch: Optional[int] = None,
+               fields: Optional[List[str]] = None,
+               budget: Optional[float] = None) \
+        -> Iterator[Tuple[str, Union[Dict, Exception]]]:
+    """
+    Parse the given fields of multiple documents, each given by the path
+    to its file or by a (source, plain text) pair, by a pool of `jobs`
+    worker processes, 0 meaning one per available CPU. Yield the path or
+    the source of each document together with its result, or the error
+    preventing it, as soon as it is available: in the order of the sources
+    if `ordered`, or in the order of completion otherwise.
+
+    The sources are consumed lazily, with at most `prefetch` of them being
+    parsed ahead of the consumer, so that arbitrarily long iterables are
+    parsed in a flat memory, see `parallel.bounded_map`.
+    """
+
+    if jobs == 0:
+        jobs = os.cpu_count() or 1
+
+    parse_function = partial(parse_source, fields=fields, budget=budget)
+    for source, outcome in bounded_map(parse_function, sources, jobs,
+                                       ordered, prefetch):
+        yield source if isinstance(source, str) else source[0], outcome
+
+
+def load_result(input_path: str, cache: Optional[ResultCache] = None,
+                hook: Optional[FieldHook] = None,
+                fields: Optional[List[str]] = None,
+                budget: Optional[float] = None,
+                contents: Optional[bytes] = None) -> Tuple[Dict, bool]:
+    """
+    Parse the given fields of a single document, or reuse its result from
+    the cache, if given. Also tell whether the result was found in the cache.
+    Results with fields left empty for exceeding the budget are not cached.
+    The contents of the input file are decoded instead of loading it,
+    if already read. Compressed files and archive members are decompressed
+    first, so that they are cached by their decompressed contents.
+    """
+
+    if fields is None:
+        fields = list(FIELD_PARSERS)
+
+    if contents is None and is_packed(input_path):
+        contents = read_packed(input_path)
+
+    if cache is not None:
+        key = cache.key(input_path, fields, contents)
+        result = cache.get(key)
+        if result is not None:
+            return result, True
+
+    document = load_input(input_path) if contents is None \
+        else decode_document(contents)
+    with document:
+        parsed = parse_document(document, hook, fields, budget)
+        result = dict(parsed)
+
+    for field in parsed.expired:
+        print(f"Field '{field}' of '{input_path}' exceeded the time budget, "
+              "leaving it empty", file=sys.stderr)
+
+    if cache is not None and not parsed.expired:
+        cache.put(key, result)
+    return result, False
+
+
+def serialize_result(result: Dict) -> str:
+    """Serialize the result into the pretty-printed JSON of its file."""
+
+    return json.dumps(result, indent=4, ensure_ascii=False)
+
+
+def generate_json_file(input_path: str, output_path: str,
+                       cache: Optional[ResultCache] = None,
+                       hook: Optional[FieldHook] = None,
+                       fields: Optional[List[str]] = None,
+                       budget: Optional[float] = None) \
+        -> Tuple[Dict, bool]:
     """
     Perform parsing of a single document and serialization of the resultant
-    JSON, with optional pretty-printing.
+    JSON. The parsed result is returned for optional pretty-printing,
+    together with whether it was found in the cache.
     """
 
-    max_read = 64 * 1024 * 1024
+    result, cache_hit = load_result(input_path, cache, hook, fields, budget)
+    write_atomically(output_path, serialize_result(result))
 
-    with open(input_path, "r", encoding="utf8") as file:
-        plain_text = file.read(max_read)
-        if len(plain_text) == max_read:
-            raise MemoryError("File is too large")
+    return result, cache_hit
 
-    result = parse(plain_text)
-    output = json.dumps(result, indent=4, ensure_ascii=False)
+
+def print_result(sequence_number: int, name: str, result: Dict,
+                 pretty_printed_fields: List[str]):
+    """Pretty-print the result of a single document, if requested."""
 
     if len(pretty_printed_fields) != 0:
         if sequence_number != 1:
             print(end="\n" * 2)
-        print(f"{sequence_number}.",
-              os.path.splitext(os.path.basename(input_path))[0])
+        print(f"{sequence_number}.", name)
 
     pretty_printer.pretty_print(result, pretty_printed_fields)
 
-    with open(output_path, "w", encoding="utf8") as file:
-        file.write(output)
 
+def output_path_for(input_file: InputFile, output_folder: str) -> str:
+    """
+    Derive the path of the JSON file corresponding to an input file,
+    creating its subfolder of the output folder, if any.
+    """
+
+    output_path = os.path.join(output_folder, input_file.name + ".json")
+    if os.path.dirname(input_file.name):
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    return output_path
+
+
+# The path to an input file, to its output file, if written into one, and
+# the name of its output, see `inputs.InputFile`.
+Task = Tuple[str, Optional[str], str]
+
+
+class TaskOutcome(NamedTuple):
+    """The result of a single document, or the error preventing it."""
+
+    result: Optional[Dict]
+    error: Optional[str]
+    cache_hit: bool = False
+    samples: List[FieldSample] = []
+
+
+def generate_json_file_task(paths: Task,
+                            cache: Optional[ResultCache] = None,
+                            profile: bool = False,
+                            fields: Optional[List[str]] = None,
+                            budget: Optional[float] = None) \
+        -> TaskOutcome:
+    """
+    Run `generate_json_file` on an (input, output) pair, capturing the error
+    message instead of raising, so that it can be reported by the parent
+    process. Without an output path, the result is only loaded, to be
+    written by the parent process. The field parsers are profiled if
+    requested.
+    """
+
+    input_path, output_path, _ = paths
+    profiler = Profiler(input_path) if profile else None
+
+    try:
+        if output_path is None:
+            result, cache_hit = load_result(input_path, cache, profiler,
+                                            fields, budget)
+        else:
+            result, cache_hit = generate_json_file(
+                input_path, output_path, cache, profiler, fields, budget)
+    except Exception as e:
+        return TaskOutcome(None, str(e))
+
+    samples = profiler.samples if profiler is not None else []
+    return TaskOutcome(result, None, cache_hit, samples)
+
+
+def pipeline_task(paths: Task, contents: Optional[bytes],
+                  cache: Optional[ResultCache] = None, profile: bool = False,
+                  fields: Optional[List[str]] = None,
+                  budget: Optional[float] = None) \
+        -> Tuple[TaskOutcome, Optional[Tuple[str, str]]]:
+    """
+    Run like `generate_json_file_task`, on the contents of the input file
+    read by the pipeline, if any, but produce the serialized result together
+    with its output path, if any, to be written by the pipeline instead.
+    """
+
+    input_path, output_path, _ = paths
+    profiler = Profiler(input_path) if profile else None
+
+    try:
+        result, cache_hit = load_result(input_path, cache, profiler, fields,
+                                        budget, contents)
+        output = (output_path, serialize_result(result)) \
+            if output_path is not None else None
+    except Exception as e:
+        return TaskOutcome(None, str(e)), None
+
+    samples = profiler.samples if profiler is not None else []
+    return TaskOutcome(result, None, cache_hit, samples), output
+
+
+def read_task_input(paths: Task) -> Optional[bytes]:
+    """Read the input file of the task, see `inputs.read_input`."""
+
+    return read_input(paths[0])
 
-def generate_multiple_json_files(input_files: List[str], output_folder: str,
-                                 pretty_printed_fields: List[str]):
+
+def failed_task(paths: Task, error: Exception) -> TaskOutcome:
+    """The outcome of a task the pipeline failed on."""
+
+    return TaskOutcome(None, str(error))
+
+
+def chunk_size_for(task_count: Optional[int], jobs: int) -> int:
+    """
+    Choose the number of tasks submitted to a worker at once. Several chunks
+    per worker are kept, so that documents of uneven size still balance well.
+    Tasks of an unknown number, e.g. of discovered input files, are
+    submitted one by one, so that each is parsed as soon as it is known.
+    """
+
+    if task_count is None:
+        return 1
+    return max(1, min(32, task_count // (jobs * 4)))
+
+
+def generate_multiple_json_files(input_files: Iterable[Union[str, InputFile]],
+                                 output_folder: str,
+                                 pretty_printed_fields: List[str],
+                                 jobs: int = 1,
+                                 cache: Optional[ResultCache] = None,
+                                 profile_slowest: Optional[int] = None,
+                                 fields: Optional[List[str]] = None,
+                                 budget: Optional[float] = None,
+                                 writer: Optional[ResultWriter] = None,
+                                 read_ahead: Optional[int] = None) \
+        -> List[str]:
     """
     Perform parsing and results serialization of multiple documents,
-    sequentially.
+    sequentially or using a pool of `jobs` worker processes. Results are
+    pretty-printed in the order of the input files in both cases. Only
+    the given fields are parsed, along with the pretty-printed ones.
+
+    The input files are given by their paths, or as discovered, see
+    `inputs.discover_inputs`, and are taken lazily, so that any number
+    of them is parsed in a flat memory.
+
+    If `read_ahead` is given, the reading of the input files, their parsing
+    and the writing of the results are pipelined, with that many input
+    files read ahead of the parsing, see `pipeline.Pipeline`.
+
+    If a writer is given, the results are written into it, in the order of
+    the input files, instead of into a file each in the output folder.
+
+    If `profile_slowest` is given, the field parsers are profiled and
+    a report including that many slowest fields is printed at the end.
+    Each field parser may run for at most the budget in seconds, if given.
+
+    The paths of the input files which could not be parsed are returned.
     """
 
-    if not os.path.isdir(output_folder):
+    if writer is None and not os.path.isdir(output_folder):
+        print(f"No such directory: '{output_folder}'", file=sys.stderr)
+        return [path.path if isinstance(path, InputFile) else path
+                for path in input_files]
+
+    # Only counted if given as a whole, so that discovered input files are
+    # parsed while the rest are still being discovered.
+    task_count = len(input_files) if isinstance(input_files, list) else None
+    tasks: Iterator[Task] = (
+        (input_file.path,
+         output_path_for(input_file, output_folder) if writer is None
+         else None,
+         input_file.name)
+        for input_file in (
+            path if isinstance(path, InputFile) else direct_input(path)
+            for path in input_files))
+    if fields is not None:
+        fields = [field for field in FIELD_PARSERS
+                  if field in fields or field in pretty_printed_fields]
+
+    samples: List[FieldSample] = []
+
+    if read_ahead is not None:
+        report = ResultReport(pretty_printed_fields, samples, writer)
+        stage_function = partial(pipeline_task, cache=cache,
+                                 profile=profile_slowest is not None,
+                                 fields=fields, budget=budget)
+        Pipeline(read_task_input, stage_function, report.add, failed_task,
+                 jobs, read_ahead).run(tasks)
+    else:
+        task_function = partial(generate_json_file_task, cache=cache,
+                                profile=profile_slowest is not None,
+                                fields=fields, budget=budget)
+        outcomes = bounded_map(task_function, tasks, jobs,
+                               chunk_size=chunk_size_for(task_count, jobs))
+        report = report_results(outcomes, pretty_printed_fields, samples,
+                                writer)
+
+    if cache is not None:
+        cache.evict()
+        print(f"Cache: {report.hits} hits, {report.misses} misses",
+              file=sys.stderr)
+
+    if profile_slowest is not None and samples:
+        print_report(samples, profile_slowest)
+
+    return report.failed
+
+
+class ResultReport:
+    """
+    Pretty-prints the results, or reports the failures, of the tasks added
+    in their order, collecting their profiling samples. The results are
+    also written into the writer, if given. The results found and not found
+    in the cache are counted, and the input files which failed are listed.
+    """
+
+    def __init__(self, pretty_printed_fields: List[str],
+                 samples: List[FieldSample],
+                 writer: Optional[ResultWriter] = None):
+        self.pretty_printed_fields = pretty_printed_fields
+        self.samples = samples
+        self.writer = writer
+        self.count = 0
+        self.hits = 0
+        self.misses = 0
+        self.failed: List[str] = []
+
+    def add(self, task: Task, outcome: TaskOutcome) -> None:
+        input_file = task[0]
+        self.count += 1
+
+        if outcome.result is None:
+            print(f"Skipping file '{input_file}': {outcome.error}",
+                  file=sys.stderr)
+            self.failed.append(input_file)
+            return
+
+        if self.writer is not None:
+            self.writer.write(input_file, outcome.result)
+        print_result(self.count, task[2], outcome.result,
+                     self.pretty_printed_fields)
+        self.samples += outcome.samples
+        if outcome.cache_hit:
+            self.hits += 1
+        else:
+            self.misses += 1
+
+
+def report_results(outcomes: Iterator[Tuple[Task, TaskOutcome]],
+                   pretty_printed_fields: List[str],
+                   samples: List[FieldSample],
+                   writer: Optional[ResultWriter] = None) -> "ResultReport":
+    """Report the (task, outcome) pairs in their order, see `ResultReport`."""
+
+    report = ResultReport(pretty_printed_fields, samples, writer)
+    for task, outcome in outcomes:
+        report.add(task, outcome)
+
+    return report
+
+
+def watch_folder(folder: str, output_folder: str,
+                 pretty_printed_fields: List[str], jobs: int = 1,
+                 cache: Optional[ResultCache] = None,
+                 fields: Optional[List[str]] = None,
+                 budget: Optional[float] = None,
+                 writer: Optional[ResultWriter] = None,
+                 state_path: Optional[str] = None,
+                 interval: float = DEFAULT_WATCH_INTERVAL,
+                 read_ahead: Optional[int] = None) -> None:
+    """
+    Keep parsing the input files added to or changed in the folder, like
+    `generate_multiple_json_files`, until interrupted. The parsed files are
+    recorded in the state file, by default in the output folder, so that
+    only the files changed in the meantime are parsed on the next run.
+    The parsing is pipelined if `read_ahead` is given.
+    """
+
+    if writer is None and not os.path.isdir(output_folder):
         print(f"No such directory: '{output_folder}'", file=sys.stderr)
         return
 
-    for i, input_file in enumerate(input_files, start=1):
-        basename = os.path.splitext(input_file)[0]
-        basename = os.path.basename(basename)
-        output_file = os.path.join(output_folder, basename + ".json")
+    def parse_files(input_files: List[str]) -> List[str]:
+        failed = generate_multiple_json_files(input_files, output_folder,
+                                              pretty_printed_fields, jobs,
+                                              cache, None, fields, budget,
+                                              writer, read_ahead)
+        if writer is not None:
+            writer.flush()
+        return failed
+
+    if state_path is None:
+        state_path = os.path.join(output_folder, STATE_FILE_NAME)
+    # Any other version of the parser, or other fields, parse all again.
+    version = parser_fingerprint() + ":" + \
+        ",".join(fields if fields is not None else FIELD_PARSERS)
+
+    watch(folder, parse_files, WatchState(state_path, version), interval,
+          DEFAULT_SETTLE_TIME)
 
-        try:
-            generate_json_file(i, input_file, output_file,
-                               pretty_printed_fields)
-        except Exception as e:
-            print(f"Skipping file '{input_file}': {e}", file=sys.stderr)
+
+def input_files_for(paths: List[str], manifest: Optional[str],
+                    patterns: List[str], recursive: bool = False) \
+        -> Iterable[Union[str, InputFile]]:
+    """
+    The input files given by the paths and listed in the manifest, if any.
+    These are discovered lazily if there are any folders or archives among
+    them, see `inputs.discover_inputs`, otherwise the paths are taken as
+    they are.
+    """
+
+    if manifest is None and not any(os.path.isdir(path) or is_archive(path)
+                                    for path in paths):
+        return paths
+    if manifest is not None:
+        return discover_inputs(
+            itertools.chain(paths, read_manifest(manifest)), patterns,
+            recursive)
+    return discover_inputs(paths, patterns, recursive)
 
 
 def parsed_fields(string: str) -> List[str]:
@@ -111,6 +606,33 @@ def parsed_fields(string: str) -> List[str]:
     return fields
 
 
+def jobs_count(string: str) -> int:
+    """
+    Parse the number of worker processes, where 0 stands for the number
+    of available CPUs.
+    """
+
+    try:
+        jobs = int(string)
+    except ValueError:
+        jobs = -1
+
+    if jobs < 0:
+        raise argparse.ArgumentTypeError(
+            f"'{string}' is not a valid number of jobs")
+
+    return jobs if jobs != 0 else os.cpu_count() or 1
+
+
+def stop_on_terminate() -> None:
+    """
+    Stop on SIGTERM the same way as on an interrupt, by KeyboardInterrupt,
+    so that a service manager stops a long-running command cleanly.
+    """
+
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+
+
 def parse_args():
     """Parse the command-line arguments."""
 
@@ -120,13 +642,51 @@ def parse_args():
 
     argument_parser.add_argument(
         "input_files",
-        help="A list of input files in plaintext format.",
-        type=str, nargs='+')
+        help="A list of input files in plaintext format, possibly compressed "
+             "by gzip, bzip2 or xz, or folders or zip and tar archives of "
+             "them. A single archive member is given as ARCHIVE::MEMBER.",
+        type=str, nargs='*')
+    argument_parser.add_argument(
+        "--manifest",
+        help="Path to a file listing the input files or folders, one per "
+             "line, or - for standard input. These are parsed after the ones "
+             "given as arguments, while still being read.",
+        metavar="FILE",
+        type=str, default=None)
+    argument_parser.add_argument(
+        "-r", "--recursive",
+        help="Also parse the files in the subfolders of the input folders. "
+             "Their results are written into the same subfolders of "
+             "the output folder.",
+        action="store_true")
+    argument_parser.add_argument(
+        "--include",
+        help="A glob pattern of the names of the files parsed within "
+             f"the input folders and archives, {DEFAULT_INPUT_PATTERN} by "
+             "default, also matching the compressed files. May be "
+             "given multiple times, to parse the files matching any of them.",
+        metavar="PATTERN",
+        type=str, action="append", default=None)
     argument_parser.add_argument(
         "-o", "--output_folder",
         help="Path to an existing outupt folder, into which "
              "the correspondingly named list of JSON files will be written.",
         type=str, default=".")
+    argument_parser.add_argument(
+        "--output_format",
+        help="The format of the results: json for a pretty-printed JSON file "
+             "per input file in the output folder, jsonl for JSON Lines, "
+             "a compact JSON object per line with the input file path under "
+             "\"source\", all in a single output file, or sqlite for "
+             "an SQLite database in the output file, queried by "
+             "'pyser.py --query'.",
+        choices=OUTPUT_FORMATS, default="json")
+    argument_parser.add_argument(
+        "--output_file",
+        help="Path to the output file of the jsonl format, standard output "
+             "by default, or of the sqlite format. The jsonl output is "
+             "compressed by gzip if the path ends with .gz.",
+        type=str, default="-")
     argument_parser.add_argument(
         "-p", "--pretty_print",
         help="A comma-separated list of the fields (without whitespace) "
@@ -138,11 +698,176 @@ def parse_args():
              "without duplication.",
         metavar="FIELD_LIST",
         type=parsed_fields, default="")
-    return argument_parser.parse_args()
+    argument_parser.add_argument(
+        "-f", "--fields",
+        help="A comma-separated list of the fields (without whitespace) "
+             "to parse, in the same format as for pretty-printing. Only "
+             "these fields are written, along with the pretty-printed ones. "
+             "All the fields are parsed by default.",
+        metavar="FIELD_LIST",
+        type=parsed_fields, default="all")
+    argument_parser.add_argument(
+        "--cache_folder",
+        help="Path to the folder of the cache of parsing results, reused "
+             "for unchanged input files by the same version of the parser.",
+        type=str, default=DEFAULT_CACHE_FOLDER)
+    argument_parser.add_argument(
+        "--cache_size",
+        help="The maximum size of the cache in MiB, beyond which the least "
+             "recently used results are evicted.",
+        metavar="MIB",
+        type=int, default=DEFAULT_CACHE_SIZE // (1024 * 1024))
+    argument_parser.add_argument(
+        "--no_cache",
+        help="Neither reuse nor store the parsing results.",
+        action="store_true")
+    argument_parser.add_argument(
+        "--refresh",
+        help="Parse all the input files again, replacing their cached "
+             "results.",
+        action="store_true")
+    argument_parser.add_argument(
+        "--profile",
+        help="Measure the time, the regular expression calls and the peak "
+             "allocated memory of each field parser, and print a report "
+             "of them, listing the slowest fields of the documents. Cached "
+             "results are not reused.",
+        action="store_true")
+    argument_parser.add_argument(
+        "--profile_slowest",
+        help="The number of the slowest fields listed by --profile.",
+        metavar="N",
+        type=int, default=10)
+    argument_parser.add_argument(
+        "--time_budget",
+        help="The maximum time in seconds a field parser may take on a single "
+             "file, after which the field is left empty. 0 means no limit. "
+             "Only supported on Unix-like platforms.",
+        metavar="SECONDS",
+        type=float, default=DEFAULT_FIELD_BUDGET)
+    argument_parser.add_argument(
+        "-j", "--jobs",
+        help="The number of worker processes parsing the input files "
+             "in parallel, 0 meaning one per available CPU. "
+             "Pretty-printed results keep the order of the input files.",
+        metavar="N",
+        type=jobs_count, default=1)
+    argument_parser.add_argument(
+        "--pipeline",
+        help="Overlap the reading of the input files, their parsing by "
+             "the worker processes and the writing of the results, so that "
+             "slow storage does not keep the workers waiting.",
+        action="store_true")
+    argument_parser.add_argument(
+        "--read_ahead",
+        help="The number of the input files read ahead of the parsing by "
+             "--pipeline.",
+        metavar="N",
+        type=int, default=DEFAULT_READ_AHEAD)
+    argument_parser.add_argument(
+        "--watch",
+        help="Keep watching the folder, parsing the .txt files added to or "
+             "changed in it since their last parsing, instead of the input "
+             "files. Files are parsed once they stop being written to.",
+        metavar="DIR",
+        type=str, default=None)
+    argument_parser.add_argument(
+        "--watch_interval",
+        help="The time in seconds between the passes over the watched "
+             "folder.",
+        metavar="SECONDS",
+        type=float, default=DEFAULT_WATCH_INTERVAL)
+    argument_parser.add_argument(
+        "--watch_state",
+        help="Path to the file recording the parsed files of the watched "
+             "folder, " + STATE_FILE_NAME + " in the output folder by "
+             "default.",
+        type=str, default=None)
+    argument_parser.add_argument(
+        "--serve",
+        help="Serve parse requests over HTTP instead, with the options of "
+             "the service, see 'pyser.py --serve --help'. Must be the first "
+             "argument.",
+        action="store_true")
+    argument_parser.add_argument(
+        "--query",
+        help="Look up the versions in the results written by "
+             "--output_format sqlite instead, see 'pyser.py --query --help'. "
+             "Must be the first argument.",
+        action="store_true")
+    args = argument_parser.parse_args()
+
+    if args.serve or args.query:
+        argument_parser.error(f"--{'serve' if args.serve else 'query'} must "
+                              "be the first argument")
+    if (args.watch is None) == \
+            (not args.input_files and args.manifest is None):
+        argument_parser.error("either the input files, --manifest or --watch "
+                              "is required")
+    if args.manifest not in (None, STANDARD_INPUT) and \
+            not os.path.isfile(args.manifest):
+        argument_parser.error(f"no such manifest file: '{args.manifest}'")
+    if args.profile_slowest < 0:
+        argument_parser.error("the number of the slowest fields must not be "
+                              "negative")
+    if args.read_ahead < 1:
+        argument_parser.error("the pipeline must read at least 1 file "
+                              "ahead")
+    if args.watch is not None and not os.path.isdir(args.watch):
+        argument_parser.error(f"no such directory to watch: '{args.watch}'")
+
+    if args.output_format == "sqlite" and args.output_file == "-":
+        argument_parser.error("the sqlite format requires --output_file")
+    if args.output_format == "jsonl" and args.output_file == "-" and \
+            args.pretty_print:
+        argument_parser.error("pretty-printing cannot be combined with "
+                              "the jsonl format written to standard output")
+    return args
 
 
 if __name__ == "__main__":
+    if sys.argv[1:2] == ["--serve"]:
+        import server
+        sys.exit(server.main(sys.argv[2:]))
+    if sys.argv[1:2] == ["--query"]:
+        import query
+        sys.exit(query.main(sys.argv[2:]))
+
     args = parse_args()
-    generate_multiple_json_files(args.input_files,
-                                 args.output_folder,
-                                 args.pretty_print)
+    cache = None
+    if not args.no_cache:
+        cache = ResultCache(args.cache_folder,
+                            args.cache_size * 1024 * 1024,
+                            args.refresh or args.profile)
+
+    read_ahead = args.read_ahead if args.pipeline else None
+    writer = open_writer(args.output_format, args.output_file)
+    try:
+        if args.watch is not None:
+            stop_on_terminate()
+            try:
+                watch_folder(args.watch, args.output_folder,
+                             args.pretty_print, args.jobs, cache,
+                             args.fields, args.time_budget, writer,
+                             args.watch_state, args.watch_interval,
+                             read_ahead)
+            except KeyboardInterrupt:
+                pass
+        else:
+            input_files = input_files_for(
+                args.input_files, args.manifest,
+                args.include or [DEFAULT_INPUT_PATTERN], args.recursive)
+            profile_slowest = args.profile_slowest if args.profile else None
+            generate_multiple_json_files(input_files,
+                                         args.output_folder,
+                                         args.pretty_print,
+                                         args.jobs,
+                                         cache,
+                                         profile_slowest,
+                                         args.fields,
+                                         args.time_budget,
+                                         writer,
+                                         read_ahead)
+    finally:
+        if writer is not None:
+            writer.close()
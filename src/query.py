@@ -0,0 +1,105 @@
+import argparse
+from output import version_keys
+import os
+import sqlite3
+from typing import Iterator, List, Tuple
+from urllib.request import pathname2url
+
+
+def open_database(path: str) -> sqlite3.Connection:
+    """Open the database written in the sqlite format, for reading only."""
+
+    return sqlite3.connect(f"file:{pathname2url(path)}?mode=ro", uri=True)
+
+
+def find_versions(connection: sqlite3.Connection, families: List[str],
+                  values: List[str]) -> Iterator[Tuple[str, str, str]]:
+    """
+    Produce the (source, family, value) of the versions found in
+    the documents, of any of the given families, ignoring the case, and of
+    any of the given values, by their keys, see `output.version_keys`,
+    ordered by the sources. Either is looked up by an index.
+    """
+
+    keys = list(dict.fromkeys(key for value in values
+                              for key in version_keys(value)))
+    if values and not keys:
+        # Only separators, spelling no version.
+        return
+    conditions = []
+    parameters = []
+    if families:
+        conditions.append(f"family IN ({', '.join('?' * len(families))})")
+        parameters += families
+    if keys:
+        conditions.append(f"key IN ({', '.join('?' * len(keys))})")
+        parameters += keys
+
+    yield from connection.execute(
+        "SELECT DISTINCT documents.source, versions.family, versions.value "
+        "FROM versions JOIN documents ON documents.id = versions.document "
+        f"WHERE {' AND '.join(conditions)} "
+        "ORDER BY documents.source, versions.family, versions.value",
+        parameters)
+
+
+def parse_args(arguments: List[str]):
+    """Parse the command-line arguments of the query."""
+
+    argument_parser = argparse.ArgumentParser(
+        prog="pyser.py --query",
+        description="Look up the versions found in the documents, in "
+                    "the results written by --output_format sqlite. Prints "
+                    "the source, the family and the value of each of them, "
+                    "separated by tabs. Exits with 1 if none is found.")
+
+    argument_parser.add_argument(
+        "database",
+        help="Path to the results written in the sqlite format.",
+        type=str)
+    argument_parser.add_argument(
+        "--family",
+        help="A family of the versions to look up, such as rsa or sha, "
+             "ignoring the case. May be given multiple times, to look up "
+             "any of them.",
+        type=str, action="append", default=[])
+    argument_parser.add_argument(
+        "--value",
+        help="A version to look up, such as RSA-1024 or SHA-1, however "
+             "spelled: regardless of the case, the whitespace, the dashes "
+             "and the underscores, and also within combined versions, such "
+             "as RSA 1024/2048. May be given multiple times, to look up any "
+             "of them.",
+        type=str, action="append", default=[])
+    argument_parser.add_argument(
+        "-l", "--sources_only",
+        help="Print only the sources of the documents, each once.",
+        action="store_true")
+
+    args = argument_parser.parse_args(arguments)
+    if not args.family and not args.value:
+        argument_parser.error("either --family or --value is required")
+    if not os.path.isfile(args.database):
+        argument_parser.error(f"no such database: '{args.database}'")
+    return args
+
+
+def main(arguments: List[str]) -> int:
+    args = parse_args(arguments)
+
+    found = False
+    previous_source = None
+    connection = open_database(args.database)
+    try:
+        for source, family, value in find_versions(connection, args.family,
+                                                   args.value):
+            found = True
+            if not args.sources_only:
+                print(f"{source}\t{family}\t{value}")
+            elif source != previous_source:
+                print(source)
+            previous_source = source
+    finally:
+        connection.close()
+
+    return 0 if found else 1
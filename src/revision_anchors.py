@@ -0,0 +1,128 @@
+import patterns
+import re
+from typing import Collection, Dict, Iterator, List, NamedTuple, Optional, \
+    Tuple
+
+
+class Anchor(NamedTuple):
+    """
+    An occurrence of an anchor, from its first character up to the end of
+    the text its pattern captures, or of the character if none.
+    """
+
+    start: int
+    end: int
+
+
+class AnchorRegistry:
+    """
+    The kinds of anchors the revisions parser looks for, by their unique
+    names, so that all of them are found in a single pass over the document.
+    Each pattern matches only a single character, with the rest in
+    a lookahead, so that no anchor hides another one starting within it,
+    and may capture the text following it by a single group.
+    """
+
+    def __init__(self) -> None:
+        self.anchors: Dict[str, List[str]] = {}
+        self.pattern: Optional[patterns.Pattern] = None
+        # The name of the anchor and the index of its captured group, if any,
+        # by the index of the empty group ending each alternative pattern.
+        self.groups: Dict[int, Tuple[str, Optional[int]]] = {}
+
+    def register(self, name: str, *alternatives: str) -> None:
+        """
+        Register an anchor by its alternative patterns, each without any
+        top-level "|", matched in the lowercase text. Anchors registered
+        earlier are preferred at the same position.
+        """
+
+        if name in self.anchors:
+            raise ValueError(f"Anchor '{name}' is already registered")
+        if self.pattern is not None:
+            raise ValueError(f"Anchor '{name}' is registered too late")
+        self.anchors[name] = list(alternatives)
+
+    def compile(self) -> patterns.Pattern:
+        """Combine the anchors into a single pattern, once."""
+
+        if self.pattern is not None:
+            return self.pattern
+
+        # Each alternative is told by the empty group ending it. A group
+        # starting it instead would keep the search from skipping quickly
+        # to the first characters of the anchors.
+        branches = []
+        group = 0
+        for name, alternatives in self.anchors.items():
+            for alternative in alternatives:
+                captures = re.compile(alternative).groups
+                if captures > 1:
+                    raise ValueError(
+                        f"Anchor '{name}' captures more than once")
+                group += captures + 1
+                self.groups[group] = (name, group - 1 if captures else None)
+                branches.append(alternative + "()")
+
+        self.pattern = patterns.compile("revision_anchors.anchors",
+                                        "|".join(branches))
+        return self.pattern
+
+
+REGISTRY = AnchorRegistry()
+
+
+def register(name: str, *alternatives: str) -> None:
+    """Register an anchor of the revisions, see `AnchorRegistry`."""
+
+    REGISTRY.register(name, *alternatives)
+
+
+class RevisionAnchors:
+    """
+    The anchors of the headers and the headings of the revisions in
+    a document, all found in a single pass over the lowercase text instead
+    of a search for each kind, and only as far as asked for, so that what
+    is found early is found fast.
+    """
+
+    def __init__(self, folded: str, registry: AnchorRegistry = REGISTRY):
+        self.folded = folded
+        self.registry = registry
+        self.matches: Optional[Iterator["re.Match[str]"]] = \
+            registry.compile().finditer(folded)
+        # All the anchors found so far, in the order of the document.
+        self.ordered: List[Tuple[str, Anchor]] = []
+
+    def scan_next(self) -> bool:
+        """Find the next anchor, telling whether there was any."""
+
+        if self.matches is None:
+            return False
+
+        match = next(self.matches, None)
+        if match is None:
+            self.matches = None
+            return False
+
+        name, captured = self.registry.groups[match.lastindex or 0]
+        end = match.end()
+        if captured is not None and match.start(captured) != -1:
+            end = match.end(captured)
+
+        anchor = Anchor(match.start(), end)
+        self.ordered.append((name, anchor))
+        return True
+
+    def walk(self, names: Collection[str]) -> Iterator[Tuple[str, Anchor]]:
+        """
+        Produce the (name, anchor) of the anchors of the given names, in
+        the order of the document, scanning it further only once needed.
+        """
+
+        position = 0
+        while position < len(self.ordered) or self.scan_next():
+            name, anchor = self.ordered[position]
+            position += 1
+            if name in names:
+                yield name, anchor
@@ -1,5 +1,63 @@
+from document import Document
+import patterns
 import re
-from typing import Dict, List
+import revision_anchors
+from typing import Callable, Dict, List, Optional, Tuple
+
+
+REVISION_EX = r"v?([0-9.]+)"
+DATE_EX = r"([0-9-A-Za-z-\.]+)"
+# The same without capturing, for lookarounds.
+REVISION_FORM = r"v?[0-9.]+"
+DATE_FORM = r"[0-9-A-Za-z-\.]+"
+
+RE_DATE_SEPARATOR = patterns.compile("revisions.date_separator", r"\.|-")
+
+# The entries end with the first four line breaks in a row after the header,
+# or after this many characters if there are none.
+ENTRIES_END = "\n" * 4
+MAX_ENTRIES_SIZE = 5000
+
+# An entry follows whitespace, which is matched only by its last character,
+# or the last two, to find the same entries as when matched by all of it.
+# Otherwise each position within a long whitespace run would be tried with
+# the whole rest of the run.
+RE_VER_DATE_DESC = patterns.compile(
+    "revisions.ver_date_desc", rf"\s{REVISION_EX}\s+{DATE_EX}?[\s:]\s+(.*)")
+# The entry without a date is matched only unless the one with a date
+# would be, at the same start.
+RE_DATE_VER_DESC = patterns.compile(
+    "revisions.date_ver_desc",
+    rf"\s(?:{DATE_EX}\s+|\s(?!{DATE_FORM}\s+{REVISION_FORM}[\s:]\s))"
+    rf"{REVISION_EX}[\s:]\s+(.*)")
+
+# The headers are looked for case-insensitively, in the lowercase text.
+# The same as r"\w*rev\w*\s+date\s+.*description" at the start of a line,
+# i.e. the first word contains "rev", which is looked for only once, not
+# from each occurrence of it to the end of the word again.
+REV_DATE_HEADER = r"(?=\w*?rev)\w+\s+date\s+.*description"
+RE_REV_DATE_HEADER = patterns.compile(
+    "revisions.rev_date_header", "^" + REV_DATE_HEADER, re.MULTILINE)
+RE_HISTORY_HEADING = patterns.compile(
+    "revisions.history_heading",
+    r"REVISION HISTORY|Revision [Hh]istory|VERSION CONTROL|Version [Cc]ontrol")
+# Where the headers start among the anchors of the revisions, see
+# `find_header`: the start of a heading of the revision history, the line
+# break before a revision-date header, up to its end, the start of
+# r"date\s+ver\w*\s+.*description", up to where its last part is looked
+# for, and the start of a version header, up to its end.
+HISTORY_ANCHOR = "revisions.history_heading"
+REV_DATE_ANCHOR = "revisions.rev_date_header"
+DATE_VER_ANCHOR = "revisions.date_ver_header"
+VERSION_ANCHOR = "revisions.version_header"
+revision_anchors.register(HISTORY_ANCHOR, r"r(?=evision history)",
+                          r"v(?=ersion control)")
+revision_anchors.register(REV_DATE_ANCHOR, rf"\n(?=({REV_DATE_HEADER}))")
+revision_anchors.register(DATE_VER_ANCHOR, r"d(?=ate(\s+ver\w*\s+))")
+revision_anchors.register(VERSION_ANCHOR,
+                          r"v(?=ersion(\s\s+description))")
+HEADER_ANCHORS = {HISTORY_ANCHOR, REV_DATE_ANCHOR, DATE_VER_ANCHOR,
+                  VERSION_ANCHOR}
 
 
 def month_to_number(date: str) -> str:
@@ -37,7 +95,7 @@ def clean_date(date: str) -> str:
     if not date:
         return ""
 
-    splitted = re.split("\.|-", date)
+    splitted = RE_DATE_SEPARATOR.split(date)
     if len(splitted) != 3:
         return date
 
@@ -51,12 +109,18 @@ def clean_date(date: str) -> str:
     return "-".join(splitted)
 
 
-def parse_revision(entry: str, regex: str, ver_index: int, date_index: int) \
-        -> List[Dict[str, str]]:
-    end = re.search(r"\n{4}", entry, re.IGNORECASE)
-    entry = entry[:end.span(0)[1]] if end else entry[:5000]
+def entries_window(plain_text: str, start: int) -> str:
+    """The text of the entries following a header ending at the start."""
+
+    end = plain_text.find(ENTRIES_END, start)
+    if end == -1:
+        return plain_text[start:start + MAX_ENTRIES_SIZE]
+    return plain_text[start:end + len(ENTRIES_END)]
+
 
-    results = re.findall(regex, entry)
+def parse_revision(entry: str, regex: patterns.Pattern, ver_index: int,
+                   date_index: int) -> List[Dict[str, str]]:
+    results = regex.findall(entry)
 
     final_results = []
     for result in results:
@@ -73,51 +137,129 @@ def parse_revision(entry: str, regex: str, ver_index: int, date_index: int) \
     return final_results
 
 
-REVISION_EX = r"v?([0-9.]+)"
-DATE_EX = r"([0-9-A-Za-z-\.]+)"
+# Parses the entries following a header.
+EntriesParser = Callable[[str], List[Dict[str, str]]]
 
 
 def parse_ver_date_desc(entry: str) -> List[Dict[str, str]]:
     """Parse the case with version identifier before the date."""
 
-    return parse_revision(entry,
-                         rf"\s+{REVISION_EX}\s+{DATE_EX}?[\s:]\s+(.*)",
-                         0, 1)
+    return parse_revision(entry, RE_VER_DATE_DESC, 0, 1)
 
 
 def parse_date_ver_desc(entry: str) -> List[Dict[str, str]]:
     """Parse the case with version identifier after the date."""
 
-    return parse_revision(entry,
-                         rf"\s+{DATE_EX}?\s+{REVISION_EX}[\s:]\s+(.*)",
-                         1, 0)
+    return parse_revision(entry, RE_DATE_VER_DESC, 1, 0)
 
 
-def parse(plain_text: str) -> List[Dict[str, str]]:
-    found = re.search(r"^\w*rev\w*\s+date\s+.*description",
-                      plain_text, re.IGNORECASE | re.MULTILINE)
-    if found:
-        return parse_ver_date_desc(plain_text[found.span(0)[1]:])
+class DateVerLines:
+    """
+    Follows the starts of the date-version headers to the ends of their
+    lines, searching each line for the last description only once, for
+    all the starts on it.
+    """
 
-    found = re.search(r"date\s+ver\w*\s+.*description", plain_text, re.IGNORECASE)
-    if found:
-        return parse_date_ver_desc(plain_text[found.span(0)[1]:])
+    def __init__(self, folded: str):
+        self.folded = folded
+        # The line a start was last followed to, and the last description
+        # on it.
+        self.line_end = -1
+        self.description = -1
+
+    def header(self, anchor: revision_anchors.Anchor) \
+            -> Tuple[Optional[EntriesParser], int]:
+        """
+        The parser of the entries following the header of the anchor,
+        together with where they start. The header ends with the last
+        description on the line its start is followed to, past
+        the whitespace. None if there is no description.
+        """
+
+        rest = anchor.end
+        if rest > self.line_end:
+            self.line_end = self.folded.find("\n", rest)
+            if self.line_end == -1:
+                self.line_end = len(self.folded)
+            self.description = self.folded.rfind("description", rest,
+                                                 self.line_end)
+
+        if self.description < rest:
+            return None, -1
+
+        # Only a revision-date header, later on, is preferred.
+        found = RE_REV_DATE_HEADER.search(self.folded, anchor.start)
+        if found:
+            return parse_ver_date_desc, found.end()
+        return parse_date_ver_desc, self.description + len("description")
 
-    found = re.search(r"version\s\s+description", plain_text, re.IGNORECASE)
+
+def fallback_header(version_end: int, heading_ends: List[int]) \
+        -> Tuple[Optional[EntriesParser], int]:
+    """
+    The header of the revisions when there is neither a revision-date nor
+    a date-version one: the first version header, or the second heading of
+    the revision history, or the only one.
+    """
+
+    if version_end != -1:
+        return parse_ver_date_desc, version_end
+    if heading_ends:
+        return parse_ver_date_desc, heading_ends[-1]
+    return None, -1
+
+
+def find_header(document: Document) \
+        -> Tuple[Optional[EntriesParser], int]:
+    r"""
+    Find the header of the revisions among the anchors of the revisions
+    in the document, producing the parser of the entries following
+    it, together with where they start. None if there is no header.
+    The kinds of the headers are preferred in this order, regardless of
+    their positions:
+
+    1. the first r"^\w*rev\w*\s+date\s+.*description",
+    2. the first r"date\s+ver\w*\s+.*description",
+    3. the first r"version\s\s+description",
+    4. the second heading of the revision history, as the first one is
+       probably in the table of contents, or the only one.
+    """
+
+    plain_text = document.text
+    folded = document.folded
+
+    found = RE_REV_DATE_HEADER.match(folded)
     if found:
-        return parse_ver_date_desc(plain_text[found.span(0)[1]:])
-
-    # final attempt, filtering out capitalization that could be used in normal text
-    iter = re.finditer(r"REVISION HISTORY|Revision [Hh]istory"
-                       r"|VERSION CONTROL|Version [Cc]ontrol", plain_text)
-    iter_list = list(iter)
-    if iter_list:
-        # first mention probably in toc, so take the second one, if there is one
-        if len(iter_list) < 2:
-            start = iter_list[0]
-        else:
-            start = iter_list[1]
-
-        return parse_ver_date_desc(plain_text[start.span(0)[1]:])
-
-    return []
+        return parse_ver_date_desc, found.end()
+
+    version_end = -1
+    heading_ends: List[int] = []
+    date_ver_lines = DateVerLines(folded)
+
+    for kind, anchor in document.revision_anchors.walk(HEADER_ANCHORS):
+        if kind == REV_DATE_ANCHOR:
+            return parse_ver_date_desc, anchor.end
+
+        elif kind == DATE_VER_ANCHOR:
+            entries_parser, start = date_ver_lines.header(anchor)
+            if entries_parser is not None:
+                return entries_parser, start
+
+        elif kind == VERSION_ANCHOR:
+            if version_end == -1:
+                version_end = anchor.end
+
+        elif len(heading_ends) < 2:
+            found = RE_HISTORY_HEADING.match(plain_text, anchor.start)
+            if found:
+                heading_ends.append(found.end())
+
+    return fallback_header(version_end, heading_ends)
+
+
+def parse(document: Document) -> List[Dict[str, str]]:
+    entries_parser, start = find_header(document)
+    if entries_parser is None:
+        return []
+
+    return entries_parser(entries_window(document.text, start))
@@ -0,0 +1,351 @@
+from budget import DEFAULT_FIELD_BUDGET
+from document import MAX_DECODED_SIZE
+from inputs import load_input
+import pyser
+import argparse
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import multiprocessing
+import os
+import socketserver
+import stat
+import sys
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8193
+# The number of requests queued for each worker, over which new ones are
+# rejected, so that clients back off instead of piling up.
+DEFAULT_QUEUE_DEPTH = 4
+
+
+class RequestError(Exception):
+    """A malformed parse request."""
+
+
+def parse_request(request: Dict[str, Any], budget: Optional[float]) \
+        -> Dict[str, Any]:
+    """
+    Parse the document of a request, run by a worker process. The request
+    holds either its "text" or the "path" to it, and optionally the list
+    of "fields" to parse, all of them by default.
+    """
+
+    fields = request.get("fields")
+
+    if "text" in request:
+        return pyser.parse(request["text"], fields=fields, budget=budget)
+
+    with load_input(request["path"]) as document:
+        return dict(pyser.parse_document(document, fields=fields,
+                                         budget=budget))
+
+
+def validate_request(request: Any) -> Dict[str, Any]:
+    """Check the form of a parse request, normalizing its fields."""
+
+    if not isinstance(request, dict):
+        raise RequestError("The request must be a JSON object")
+    if ("text" in request) == ("path" in request):
+        raise RequestError("The request must have either text or path")
+    if not isinstance(request.get("text", request.get("path")), str):
+        raise RequestError("The text or path must be a string")
+
+    fields = request.get("fields")
+    if fields is not None:
+        if not isinstance(fields, list) or \
+                not all(isinstance(field, str) for field in fields):
+            raise RequestError("The fields must be a list of strings")
+        try:
+            request["fields"] = pyser.parsed_fields(",".join(fields))
+        except argparse.ArgumentTypeError as e:
+            raise RequestError(str(e))
+
+    return request
+
+
+class ParseService:
+    """
+    A long-running parsing service, where the documents are parsed by
+    a pool of worker processes started once, so that a request costs only
+    the parsing itself. At most `capacity` requests are admitted at once.
+    The metrics of the handled requests are kept.
+    """
+
+    def __init__(self, workers: int, queue_depth: int,
+                 budget: Optional[float]):
+        self.workers = workers
+        self.capacity = workers * queue_depth
+        self.budget = budget
+        self.pool = multiprocessing.Pool(workers)
+        self.slots = threading.BoundedSemaphore(self.capacity)
+
+        self.lock = threading.Lock()
+        self.started = time.monotonic()
+        self.in_flight = 0
+        self.parsed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.seconds = 0.0
+
+    def parse(self, request: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Parse the document of a validated request by a worker, None if
+        the service is at its capacity. Parsing errors are raised.
+        """
+
+        if not self.slots.acquire(blocking=False):
+            with self.lock:
+                self.rejected += 1
+            return None
+
+        start = time.perf_counter()
+        with self.lock:
+            self.in_flight += 1
+
+        try:
+            result = self.pool.apply(parse_request, (request, self.budget))
+        except Exception:
+            with self.lock:
+                self.failed += 1
+            raise
+        else:
+            with self.lock:
+                self.parsed += 1
+            return result
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+                self.seconds += time.perf_counter() - start
+            self.slots.release()
+
+    def metrics(self) -> Dict[str, Any]:
+        with self.lock:
+            handled = self.parsed + self.failed
+            return {
+                "status": "ok",
+                "workers": self.workers,
+                "capacity": self.capacity,
+                "in_flight": self.in_flight,
+                "parsed": self.parsed,
+                "failed": self.failed,
+                "rejected": self.rejected,
+                "mean_seconds": self.seconds / handled if handled else 0.0,
+                "uptime_seconds": time.monotonic() - self.started,
+            }
+
+    def close(self) -> None:
+        self.pool.terminate()
+        self.pool.join()
+
+
+class ParseRequestHandler(BaseHTTPRequestHandler):
+    """
+    Handles POST /parse, with a JSON request in the body, see
+    `parse_request`, or with the plain text of the document, and
+    GET /health, reporting the metrics of the service.
+    """
+
+    server: "ParseServer"
+
+    def do_GET(self) -> None:
+        if self.path != "/health":
+            self.reply(HTTPStatus.NOT_FOUND, {"error": "Not found"})
+            return
+
+        self.reply(HTTPStatus.OK, self.server.service.metrics())
+
+    def do_POST(self) -> None:
+        if self.path != "/parse":
+            self.reply(HTTPStatus.NOT_FOUND, {"error": "Not found"})
+            return
+
+        body = self.read_body()
+        if body is None:
+            return
+
+        try:
+            request = self.read_request(body)
+        except RequestError as e:
+            self.reply(HTTPStatus.BAD_REQUEST, {"error": str(e)})
+            return
+
+        try:
+            result = self.server.service.parse(request)
+        except Exception as e:
+            self.reply(HTTPStatus.UNPROCESSABLE_ENTITY, {"error": str(e)})
+            return
+
+        if result is None:
+            self.reply(HTTPStatus.SERVICE_UNAVAILABLE,
+                       {"error": "The service is at its capacity"},
+                       {"Retry-After": "1"})
+            return
+
+        self.reply(HTTPStatus.OK, result)
+
+    def read_body(self) -> Optional[bytes]:
+        """
+        Read the body of the request, by its Content-Length. None if
+        the length is missing, invalid or too large, replying so.
+        """
+
+        length_header = self.headers.get("Content-Length")
+        if length_header is None:
+            self.reply(HTTPStatus.LENGTH_REQUIRED,
+                       {"error": "The request must have a Content-Length"})
+            return None
+        try:
+            length = int(length_header)
+        except ValueError:
+            length = -1
+        if length < 0:
+            self.reply(HTTPStatus.BAD_REQUEST,
+                       {"error": "Invalid Content-Length: "
+                                 f"'{length_header}'"})
+            return None
+        if length > MAX_DECODED_SIZE:
+            self.reply(HTTPStatus.REQUEST_ENTITY_TOO_LARGE,
+                       {"error": "The document is too large"})
+            return None
+
+        return self.rfile.read(length)
+
+    def read_request(self, body: bytes) -> Dict[str, Any]:
+        try:
+            if self.headers.get_content_type() == "application/json":
+                return validate_request(json.loads(body))
+            return {"text": body.decode("utf8")}
+        except ValueError as e:
+            raise RequestError(f"Malformed request: {e}")
+
+    def reply(self, status: HTTPStatus, data: Dict[str, Any],
+              headers: Optional[Dict[str, str]] = None) -> None:
+        body = json.dumps(data, ensure_ascii=False).encode("utf8")
+
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def address_string(self) -> str:
+        # Clients of a Unix domain socket have no address.
+        return str(self.client_address[0]) if self.client_address else "-"
+
+
+class ParseServer(ThreadingHTTPServer):
+    """Handles each request in its own thread."""
+
+    def __init__(self, address, service: ParseService):
+        self.service = service
+        super().__init__(address, ParseRequestHandler)
+
+
+class UnixParseServer(socketserver.ThreadingMixIn,
+                      socketserver.UnixStreamServer):
+    """Handles each request of a Unix domain socket in its own thread."""
+
+    daemon_threads = True
+
+    def __init__(self, path: str, service: ParseService):
+        self.service = service
+        super().__init__(path, ParseRequestHandler)
+
+
+def is_socket(path: str) -> bool:
+    """Whether the path is a socket, not following a symbolic link."""
+
+    try:
+        return stat.S_ISSOCK(os.lstat(path).st_mode)
+    except FileNotFoundError:
+        return False
+
+
+def parse_args(arguments: List[str]):
+    """Parse the command-line arguments of the service."""
+
+    argument_parser = argparse.ArgumentParser(
+        prog="pyser.py --serve",
+        description="Serve parse requests over HTTP, by a pool of worker "
+                    "processes. POST /parse takes a JSON object with either "
+                    "the \"text\" of the document or the \"path\" to it, "
+                    "and optionally a list of the \"fields\" to parse, or "
+                    "the plain text of the document. GET /health reports "
+                    "the metrics of the service.")
+
+    argument_parser.add_argument(
+        "--host",
+        help="The address to listen on.",
+        type=str, default=DEFAULT_HOST)
+    argument_parser.add_argument(
+        "--port",
+        help="The TCP port to listen on.",
+        type=int, default=DEFAULT_PORT)
+    argument_parser.add_argument(
+        "--socket",
+        help="Path to a Unix domain socket to listen on, instead of the TCP "
+             "port.",
+        type=str, default=None)
+    argument_parser.add_argument(
+        "-j", "--jobs",
+        help="The number of worker processes, 0 meaning one per available "
+             "CPU.",
+        metavar="N",
+        type=pyser.jobs_count, default=0)
+    argument_parser.add_argument(
+        "--queue_depth",
+        help="The number of requests admitted per worker at once. Requests "
+             "over it are rejected with 503 Service Unavailable.",
+        metavar="N",
+        type=int, default=DEFAULT_QUEUE_DEPTH)
+    argument_parser.add_argument(
+        "--time_budget",
+        help="The maximum time in seconds a field parser may take on "
+             "a single document, after which the field is left empty. "
+             "0 means no limit.",
+        metavar="SECONDS",
+        type=float, default=DEFAULT_FIELD_BUDGET)
+
+    args = argument_parser.parse_args(arguments)
+    # Only a socket left behind is replaced, never any other file.
+    if args.socket is not None and os.path.lexists(args.socket) and \
+            not is_socket(args.socket):
+        argument_parser.error(f"not a socket: '{args.socket}'")
+    return args
+
+
+def main(arguments: List[str]) -> int:
+    args = parse_args(arguments)
+    service = ParseService(args.jobs, max(1, args.queue_depth),
+                           args.time_budget)
+
+    server: socketserver.BaseServer
+    if args.socket is not None:
+        if is_socket(args.socket):
+            os.unlink(args.socket)
+        server = UnixParseServer(args.socket, service)
+        print(f"Serving on {args.socket}", file=sys.stderr)
+    else:
+        server = ParseServer((args.host, args.port), service)
+        print(f"Serving on http://{args.host}:{args.port}", file=sys.stderr)
+
+    pyser.stop_on_terminate()
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+        if args.socket is not None and is_socket(args.socket):
+            os.unlink(args.socket)
+
+    return 0
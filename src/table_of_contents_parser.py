@@ -1,29 +1,50 @@
 from common import squash_whitespace
+from document import Document
+import patterns
 import re
 import itertools
 from typing import List, Tuple, Optional
 
 
-RE_TOC_WITH_DOTS = re.compile(
+# The section numbers have at most 9 levels. Otherwise each of the numbers
+# of a long run, like in 1.2.3.4..., would start matching the whole run.
+RE_TOC_WITH_DOTS = patterns.compile(
+    "table_of_contents.with_dots",
     # manual negative lookbehind
     r"((?:Table|Figure|(?:Fig|Tab)\.?) |[^\s1-9])?"
-    r"([A-D1-9][0-9]?(?:\.[0-9]{1,2})*)\.?"  # section number
+    r"([A-D1-9][0-9]?(?:\.[0-9]{1,2}){0,8})\.?"  # section number
     r" {1,20}"
-    r"([A-Z](?:[^\.](?! {6,})|\.(?! ?\.)){1,80})"  # title
+    # A title character is followed by fewer than 6 spaces. Looking only
+    # for 6 of them does not scan the whole run after each character.
+    r"([A-Z](?:[^\.](?! {6})|\.(?! ?\.)){1,80})"  # title
     r" ?(?:(?:\.){2,}|(?:\.\s){2,}) ?"  # dots
     r"([0-9]+)")  # page number
 
-RE_TOC_WITHOUT_DOTS = re.compile(
+# The shortest dots of RE_TOC_WITH_DOTS, which no entry is found without.
+RE_DOT_LEADERS = patterns.compile("table_of_contents.dot_leaders",
+                                  r"\.\s?\.")
+
+RE_COLUMN_GAP = patterns.compile("table_of_contents.column_gap", r"\s{2,}")
+
+RE_TOC_WITHOUT_DOTS = patterns.compile(
+    "table_of_contents.without_dots",
     # manual negative lookbehind
     r"((?:Table|Figure|(?:Fig|Tab)\.?) |[^\s1-9])?"
-    r"([A-D1-9][0-9]?(?:\.[0-9]{1,2})*)\.?"  # section number
+    r"([A-D1-9][0-9]?(?:\.[0-9]{1,2}){0,8})\.?"  # section number
     r" {1,20}"
-    r"(.{1,80})"  # title
+    # The title ends before a whole run of spaces, or is a single space
+    # if it starts within the run, instead of ending at each of the spaces,
+    # each time followed by the rest of the run. Only the spaces the title
+    # would end with differ, and these are stripped.
+    r"(.{0,79}[^ \n]| )"  # title
     r" {5,}"
     r"([0-9]+)")  # page number
 
+RE_BROKEN_WORD = patterns.compile("table_of_contents.broken_word",
+                                  r"([A-Za-z])-\s")
 
-def find_toc_with_dots(plain_text: str) -> Optional[str]:
+
+def find_toc_with_dots(document: Document) -> Optional[str]:
     """
     Produce a substring where the dotted table of contents is located,
     None if not found.
@@ -32,7 +53,7 @@ def find_toc_with_dots(plain_text: str) -> Optional[str]:
     def is_dotted_line(line: str) -> bool:
         return len(line) >= 20 and line.count('.') >= len(line) * 0.1
 
-    lines = plain_text.split('\n')
+    lines = document.lines
     dot_lines = [i for i in range(len(lines)) if is_dotted_line(lines[i])]
 
     if len(dot_lines) == 0:
@@ -47,41 +68,70 @@ def find_toc_with_dots(plain_text: str) -> Optional[str]:
     margin = 30
     start = max(0, dot_lines[0] - margin)
     end = min(len(lines), dot_lines[-1] + margin)
-    return "\n".join(lines[start:end])
+    return document.line_range(start, end)
+
+
+def split_columns(line: str) -> Optional[Tuple[str, str]]:
+    """
+    Split the line without an entry at its widest whitespace gap, taken
+    as the gutter between two columns. None if there is no such gap.
+    """
+
+    # NOTE: This is the weak point. We have tried counting in also
+    # the surrounding page and section numbers.
+    widest_gap = None
+    widest_gap_length = 0
+
+    for gap in RE_COLUMN_GAP.finditer(line):
+        # The first of the equally wide gaps is preferred.
+        if gap.end() - gap.start() > widest_gap_length:
+            widest_gap = gap
+            widest_gap_length = gap.end() - gap.start()
+
+    if widest_gap is None:
+        return None
+    return line[:widest_gap.start()], line[widest_gap.end():]
 
 
 def parse_toc_with_dots_multiple_columns(plain_text: str) \
         -> List[Tuple[str, str, int]]:
-    lines = plain_text.split("\n")
+    """
+    Parse the dotted entries of each line, then the entries in the text
+    left and right of them, or of the widest gap on lines without any,
+    as if it was a separate column of the table of contents.
+    """
 
-    matches = []
-    left_column = ""
-    right_column = ""
+    matches: List[Tuple[str, str, str, str]] = []
+    left_column: List[str] = []
+    right_column: List[str] = []
 
-    for line in lines:
-        match_iter = RE_TOC_WITH_DOTS.finditer(line)
+    for line in plain_text.split("\n"):
+        # Lines without any dot leaders cannot hold a dotted entry.
+        match = RE_TOC_WITH_DOTS.search(line) \
+            if RE_DOT_LEADERS.search(line) else None
 
-        try:
-            match = next(match_iter)
+        if match is not None:
             lookbehind, id, title, page = match.groups()
             matches.append((lookbehind, id, title, page))
-            left_column += squash_whitespace(line[:match.start()]) + '\n'
-            right_column += squash_whitespace(line[match.end():]) + '\n'
-        except StopIteration:
-            # NOTE: This is the weak point. We have tried counting in also
-            # the surrounding page and section numbers.
-            spaces = list(re.finditer(r"\s{2,}", line))
-            if len(spaces) != 0:
-                largest_space = max(
-                    spaces, key=lambda match: match.end() - match.start())
-                left = line[:largest_space.start()]
-                right = line[largest_space.end():]
-                left_column += squash_whitespace(left) + '\n'
-                right_column += squash_whitespace(right) + '\n'
+            left, right = line[:match.start()], line[match.end():]
+        else:
+            columns = split_columns(line)
+            if columns is None:
+                continue
+            left, right = columns
+
+        left_column.append(squash_whitespace(left) + "\n")
+        right_column.append(squash_whitespace(right) + "\n")
 
     result = postprocess_matches(matches)
-    result += parse_toc_with_dots(left_column)
-    result += parse_toc_with_dots(right_column)
+
+    for column in (left_column, right_column):
+        column_text = "".join(column)
+        # Most tables of contents have a single column, the rest of their
+        # lines holding no dotted entries.
+        if RE_DOT_LEADERS.search(column_text):
+            result += parse_toc_with_dots(column_text)
+
     return result
 
 
@@ -102,7 +152,7 @@ def postprocess_match(match: Tuple[str, str, str, str]) \
 
     id, title, page_str = tuple(group.strip() for group in match[1:])
     title = squash_whitespace(title)
-    title = re.sub(r"([A-Za-z])-\s", r"\1", title)
+    title = RE_BROKEN_WORD.sub(r"\1", title)
     page = int(page_str)
     return id, title, page
 
@@ -147,8 +197,9 @@ def sort(result: List[Tuple[str, str, int]]) -> List[Tuple[str, str, int]]:
     return result
 
 
-def parse(plain_text: str) -> List[Tuple[str, str, int]]:
-    dotted_toc = find_toc_with_dots(plain_text)
+def parse(document: Document) -> List[Tuple[str, str, int]]:
+    plain_text = document.text
+    dotted_toc = find_toc_with_dots(document)
 
     if dotted_toc is not None:
         result = parse_toc_with_dots_multiple_columns(dotted_toc)
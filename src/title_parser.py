@@ -1,17 +1,41 @@
 from common import squash_whitespace
+from document import Document
+import patterns
 import re
 
 
-def parse_dirty(plain_text: str) -> str:
+RE_TITLE_LABEL = patterns.compile("title.label", r"title:?\s+([^\n]*)",
+                                  re.IGNORECASE | re.MULTILINE)
+RE_FOR_FROM = patterns.compile("title.for_from", r"for\s\s+(.*?)\s\s+from",
+                               re.MULTILINE)
+RE_AFTER_VERSION = patterns.compile(
+    "title.after_version", r"Version [0-9]+-[0-9]+\s*((?:[^\n]+\n)*)",
+    re.MULTILINE)
+# A line ends at its first line break, so the lines are matched in a single
+# way, not backtracking over their possible splits.
+RE_FIRST_LINES = patterns.compile("title.first_lines", r"(?:[^\n]+\n)+",
+                                  re.MULTILINE | re.DOTALL)
+RE_SECURITY_TARGET = patterns.compile(
+    "title.security_target", r"security target[^\n]*(.*)common criteria",
+    re.MULTILINE | re.IGNORECASE | re.DOTALL)
+RE_SEPARATE_LINE = patterns.compile("title.separate_line",
+                                    r"\n\n([^\n].+?\n)\n\n",
+                                    re.MULTILINE | re.DOTALL)
+RE_FIRST_PARAGRAPH = patterns.compile("title.first_paragraph",
+                                      r"(?:[^\n]+\n)*", re.MULTILINE)
+
+
+def parse_dirty(document: Document) -> str:
     """
     Parse the title with potentially unsquashed whitespace and trailing
     garbage.
     """
 
-    iter = re.search(r"title:?\s+([^\n]*)",
-                     plain_text, re.IGNORECASE | re.MULTILINE)
+    plain_text = document.text
+
+    iter = RE_TITLE_LABEL.search(plain_text)
     if iter:
-        potential_title_count = squash_whitespace(plain_text).count(iter.group(1))
+        potential_title_count = document.count_squashed(iter.group(1), 5)
         if potential_title_count > 5:
             return iter.group(1)
 
@@ -19,44 +43,41 @@ def parse_dirty(plain_text: str) -> str:
     plain_text = plain_text[:1000]
 
     # For documents starting with 4 numbers only.
-    iter = re.search(r"for\s\s+(.*?)\s\s+from",
-                     plain_text.replace("\n", " "), re.MULTILINE)
+    iter = RE_FOR_FROM.search(plain_text.replace("\n", " "))
     if iter:
         return iter.group(1)
 
     # e.g. NSCIB-CC-217812-CR2
-    iter = re.search(
-        r"Version [0-9]+-[0-9]+\s*(([^\n]+\n)*)", plain_text, re.MULTILINE)
+    iter = RE_AFTER_VERSION.search(plain_text)
     if iter:
         return iter.group(1)
 
     # e.g. nscib-cc-0229286sscdkeygen-stv1.2
     if "NXP " in plain_text:
-        iter = re.search(r"([^\n]+\n)+", plain_text, re.MULTILINE | re.DOTALL)
+        iter = RE_FIRST_LINES.search(plain_text)
         if iter:
             return iter.group(0)
 
     # e.g. 0782V5b_pdf
-    iter = re.search(r"security target[^\n]*(.*)common criteria",
-                     plain_text, re.MULTILINE | re.IGNORECASE | re.DOTALL)
+    iter = RE_SECURITY_TARGET.search(plain_text)
     if iter and len(squash_whitespace(iter.group(1))) > 5:
         return iter.group(1)
 
     # e.g. 1110V3b_pdf
-    iter = re.search(r"\n\n([^\n].+?\n)\n\n", plain_text, re.MULTILINE | re.DOTALL)
+    iter = RE_SEPARATE_LINE.search(plain_text)
     if iter:
         return iter.group(1)
 
     # Last resort.
-    iter = re.search(r"([^\n]+\n)*", plain_text, re.MULTILINE)
+    iter = RE_FIRST_PARAGRAPH.search(plain_text)
     if iter:
         return iter.group(0)
 
     return ""
 
 
-def parse(plain_text: str) -> str:
-    title = parse_dirty(plain_text)
+def parse(document: Document) -> str:
+    title = parse_dirty(document)
 
     index = title.lower().find("security target lite")
     if index > 0:
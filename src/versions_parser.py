@@ -1,83 +1,105 @@
 from common import deduplicate_list, squash_whitespace
+from document import Document
+import patterns
 import re
-from typing import Dict, List
+from typing import Callable, Dict, List, NamedTuple
 
 
-def parse_eal(plain_text: str) -> List[str]:
-    found = re.findall(r"[^\w](EAL ?[0-9]\+?)", plain_text)
+class VersionFamily(NamedTuple):
+    """
+    A kind of version identifiers found in the document. All the families are
+    searched for in a single scan over the document, so adding one does not
+    add another pass.
+    """
 
-    return deduplicate_list(found)
+    name: str
+    # All the characters a hit of the family can start with.
+    initials: str
+    pattern: str
+    # Produce the values recorded for a hit.
+    values: Callable[[str], List[str]]
 
 
-def parse_sha(plain_text: str) -> List[str]:
-    versions = "512|384|256|224|3|2|1"
+def hit_as_is(hit: str) -> List[str]:
+    return [hit]
 
-    plain_text = plain_text.replace(" ", "")
-    found = re.findall(
-        rf"SHA[-_ ]?\n?(?:{versions})(?:[-/_ ](?:{versions}))?",
-        plain_text, re.MULTILINE
-    )
 
-    for i in range(len(found)):
-        found[i] = squash_whitespace(found[i])
-    return deduplicate_list(found)
+def sha_values(hit: str) -> List[str]:
+    # The SHA versions are matched regardless of spaces inside.
+    return [squash_whitespace(hit.replace(" ", ""))]
 
 
-def parse_des(plain_text: str) -> List[str]:
-    found = re.findall(r"3des", plain_text, re.IGNORECASE)
-    found += re.findall(r"des3", plain_text, re.IGNORECASE)
-    found += re.findall(r"triple[- ]des", plain_text, re.IGNORECASE)
-    found += re.findall(r"tdes", plain_text, re.IGNORECASE)
+def ecc_values(hit: str) -> List[str]:
+    # The bare algorithm name is reported alongside the sized variant.
+    return ["ECC", hit] if hit != "ECC" else ["ECC"]
 
-    return deduplicate_list(found)
 
+def spaced(alternatives: str) -> str:
+    """Allow any spaces between the characters of each alternative."""
 
-def parse_rsa(plain_text: str) -> List[str]:
-    versions = "4096|2048|1024"
+    return "|".join(" *".join(alternative)
+                    for alternative in alternatives.split("|"))
 
-    found = re.findall(
-        rf"RSA[-_ ]?(?:{versions})(?:[-/_](?:{versions}))?",
-        plain_text
-    )
 
-    return deduplicate_list(found)
+SHA_VERSIONS = spaced("512|384|256|224|3|2|1")
+RSA_VERSIONS = "4096|2048|1024"
 
+VERSION_FAMILIES = [
+    VersionFamily("eal", "E", r"(?<=[^\w])EAL ?[0-9]\+?", hit_as_is),
+    VersionFamily(
+        "sha", "S",
+        rf"S *H *A *(?:[-_] *)?(?:\n *)?(?:{SHA_VERSIONS})"
+        rf"(?: *[-/_] *(?:{SHA_VERSIONS}))?",
+        sha_values),
+    VersionFamily("des", "3DTdt", r"(?i:3des|des3|triple[- ]des|tdes)",
+                  hit_as_is),
+    VersionFamily(
+        "rsa", "R",
+        rf"RSA[-_ ]?(?:{RSA_VERSIONS})(?:[-/_](?:{RSA_VERSIONS}))?",
+        hit_as_is),
+    VersionFamily("ecc", "E", r"ECC(?: ?[0-9]+)?", ecc_values),
+    VersionFamily("global_platform", "Gg",
+                  r"(?i:global ?platform (?:[0-9]\.)*[0-9])", hit_as_is),
+    VersionFamily("java_card", "Jj", r"(?i:java ?card (?:[0-9]\.)*[0-9])",
+                  hit_as_is),
+]
 
-def parse_ecc(plain_text: str) -> List[str]:
-    found = re.findall(r"ECC", plain_text)
-    found += re.findall(r"ECC ?[0-9]+", plain_text)
-    for i in range(len(found)):
-        found[i] = found[i].upper()
 
-    return deduplicate_list(found)
+def compile_scanner(families: List[VersionFamily]) -> patterns.Pattern:
+    """
+    Combine the patterns of the families into one, labelling each hit by
+    the named group of its family.
 
+    The hits are looked for at every position, so that they may overlap
+    like with a separate search per family. Matching a single initial
+    character first lets the regular expression engine skip quickly over
+    the positions no hit can start at, the hit itself is then captured
+    by a lookahead from that character.
+    """
 
-def parse_global_platform(plain_text: str) -> List[str]:
-    found = re.findall(r"global ?platform (?:[0-9]\.)*[0-9]",
-                       plain_text, re.IGNORECASE)
+    initials = "".join(sorted(set("".join(f.initials for f in families))))
+    alternatives = "|".join(f"(?P<{f.name}>{f.pattern})" for f in families)
+    return patterns.compile(
+        "versions.scanner",
+        rf"[{re.escape(initials)}](?<=(?=(?:{alternatives})).)")
 
-    return deduplicate_list(found)
 
+RE_VERSIONS = compile_scanner(VERSION_FAMILIES)
 
-def parse_java_card(plain_text: str) -> List[str]:
-    found = re.findall(r"java ?card (?:[0-9]\.)*[0-9]",
-                       plain_text, re.IGNORECASE)
 
-    return deduplicate_list(found)
+def parse(document: Document) -> Dict[str, List[str]]:
+    found: Dict[str, List[str]] = {family.name: []
+                                   for family in VERSION_FAMILIES}
+    values = {family.name: family.values for family in VERSION_FAMILIES}
 
+    for text, start, end in document.scan_windows():
+        for match in RE_VERSIONS.finditer(text, start):
+            if match.start() >= end:
+                break
 
-def parse(plain_text: str) -> Dict[str, List[str]]:
-    versions = {}
-    for (version_name, parse_function) in [
-        ("eal", parse_eal),
-        ("sha", parse_sha),
-        ("des", parse_des),
-        ("rsa", parse_rsa),
-        ("ecc", parse_ecc),
-        ("global_platform", parse_global_platform),
-        ("java_card", parse_java_card)
-    ]:
-        result = parse_function(plain_text)
-        if result:
-            versions[version_name] = result
-    return versions
+            name = match.lastgroup
+            if name is not None:
+                found[name] += values[name](match.group(name))
+
+    return {name: deduplicate_list(hits)
+            for name, hits in found.items() if hits}
@@ -0,0 +1,177 @@
+from cache import hash_file
+from output import write_atomically
+import hashlib
+import json
+import os
+import sys
+import time
+from typing import Callable, Dict, List, NamedTuple, Tuple
+
+
+DEFAULT_WATCH_INTERVAL = 1.0
+# The time a file must stay unchanged for, before it is considered
+# completely written.
+DEFAULT_SETTLE_TIME = 2.0
+WATCHED_EXTENSION = ".txt"
+STATE_FILE_NAME = ".pyser_watch.json"
+
+
+class FileState(NamedTuple):
+    """A watched file, as of its last parsing."""
+
+    size: int
+    mtime: int
+    digest: str
+
+
+# The size and the modification time in nanoseconds of a file.
+Observation = Tuple[int, int]
+
+
+def file_digest(path: str) -> str:
+    """Hash the contents of the file."""
+
+    digest = hashlib.sha256()
+    hash_file(digest, path)
+    return digest.hexdigest()
+
+
+def scan(folder: str) -> Dict[str, Observation]:
+    """Observe the text files of the folder, without reading them."""
+
+    observed = {}
+
+    with os.scandir(folder) as entries:
+        for entry in entries:
+            if entry.name.startswith(".") or \
+                    not entry.name.endswith(WATCHED_EXTENSION):
+                continue
+            try:
+                if not entry.is_file():
+                    continue
+                status = entry.stat()
+            except OSError:
+                # Removed in the meantime.
+                continue
+            observed[entry.path] = (status.st_size, status.st_mtime_ns)
+
+    return observed
+
+
+class WatchState:
+    """
+    The watched files as of their last parsing, persisted in a small JSON
+    file between the runs. The state of a different version of the parser,
+    or of different fields, is discarded, so that all the files are parsed
+    again.
+    """
+
+    def __init__(self, path: str, version: str):
+        self.path = path
+        self.version = version
+        self.files: Dict[str, FileState] = {}
+
+    def load(self) -> None:
+        try:
+            with open(self.path, "r", encoding="utf8") as file:
+                data = json.load(file)
+            if data["version"] != self.version:
+                return
+            self.files = {path: FileState(*entry)
+                          for path, entry in data["files"].items()}
+        except (OSError, ValueError, TypeError, KeyError):
+            # Missing or malformed, the files are all parsed again.
+            self.files = {}
+
+    def save(self) -> None:
+        data = {
+            "version": self.version,
+            "files": {path: list(state)
+                      for path, state in sorted(self.files.items())},
+        }
+        write_atomically(self.path, json.dumps(data, indent=1))
+
+
+class Watcher:
+    """
+    Parses the text files added to or changed in a folder since their last
+    parsing, as recorded in the state. Files still being written are
+    debounced: a file is parsed only once its size and modification time
+    stay the same between two passes, and for at least `settle` seconds.
+    Files touched without a change of their contents are not parsed again.
+    The files `parse_files` reports as failed are left out of the state,
+    so that they are parsed again on the next pass.
+    """
+
+    def __init__(self, folder: str, state: WatchState,
+                 parse_files: Callable[[List[str]], List[str]],
+                 settle: float = DEFAULT_SETTLE_TIME):
+        self.folder = folder
+        self.state = state
+        self.parse_files = parse_files
+        self.settle = int(settle * 1e9)
+        self.previous: Dict[str, Observation] = {}
+
+    def forget_removed(self, observed: Dict[str, Observation]) -> bool:
+        """Forget the files no longer observed, telling if there were any."""
+
+        removed = [path for path in self.state.files if path not in observed]
+        for path in removed:
+            del self.state.files[path]
+        return bool(removed)
+
+    def poll(self) -> List[str]:
+        """Make a single pass over the folder, producing the parsed files."""
+
+        now = time.time_ns()
+        observed = scan(self.folder)
+        changed: List[str] = []
+        dirty = False
+
+        for path, (size, mtime) in sorted(observed.items()):
+            known = self.state.files.get(path)
+            if known is not None and known[:2] == (size, mtime):
+                continue
+            if self.previous.get(path) != (size, mtime) or \
+                    now - mtime < self.settle:
+                # Possibly still being written.
+                continue
+
+            try:
+                digest = file_digest(path)
+            except OSError:
+                continue
+
+            self.state.files[path] = FileState(size, mtime, digest)
+            dirty = True
+            if known is None or known.digest != digest:
+                changed.append(path)
+
+        dirty |= self.forget_removed(observed)
+        self.previous = observed
+        if changed:
+            for path in self.parse_files(changed):
+                # Possibly unreadable for the time being.
+                del self.state.files[path]
+        if dirty:
+            self.state.save()
+
+        return changed
+
+
+def watch(folder: str, parse_files: Callable[[List[str]], List[str]],
+          state: WatchState, interval: float = DEFAULT_WATCH_INTERVAL,
+          settle: float = DEFAULT_SETTLE_TIME) -> None:
+    """
+    Keep parsing the files added to or changed in the folder, passing over
+    it every `interval` seconds, until interrupted. See `Watcher`.
+    """
+
+    state.load()
+    watcher = Watcher(folder, state, parse_files, settle)
+    print(f"Watching '{folder}', {len(state.files)} files already parsed",
+          file=sys.stderr)
+
+    while True:
+        watcher.poll()
+        time.sleep(interval)